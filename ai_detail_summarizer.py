@@ -1,9 +1,34 @@
+import asyncio
 import csv
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import itertools
+import json
+import re
 from pathlib import Path
-from typing import Callable, Dict, List, Optional
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
 
-from openai import OpenAI
+import httpx
+import orjson
+from openai import AsyncOpenAI
+
+from llm_cache import DEFAULT_DB_PATH, LLMCache
+
+BATCH_POLL_INTERVAL = 30
+BATCH_COMPLETION_WINDOW = "24h"
+# 这些服务商不提供（或不稳定提供）Batch 接口，默认走在线并发请求
+ONLINE_ONLY_HOSTS = ("siliconflow",)
+JSON_OBJECT_RE = re.compile(r"\{.*\}", re.S)
+# 不遵守 JSON 模式的服务商常把 JSON 包在 ```json 代码块里，一次匹配取出正文
+FENCE_RE = re.compile(r"```(?:json)?\s*(\{.*?\}|\[.*?\])\s*```", re.S)
+FLUSH_EVERY = 50
+SYSTEM_PROMPT = "保持输出为简体中文。"
+# 单条摘要回复通常 < 200 tokens；批量请求按条数放大
+ROW_MAX_TOKENS = 220
+STOP_SEQUENCES = ["\n```"]
+# 在线并发请求共用一个 HTTP/2 连接池
+HTTP_MAX_CONNECTIONS = 256
+HTTP_MAX_KEEPALIVE = 128
+HTTP_TIMEOUT = 120.0
+HTTP_CONNECT_TIMEOUT = 5.0
 
 
 class AIDetailSummarizer:
@@ -14,11 +39,50 @@ class AIDetailSummarizer:
         api_key: str,
         model: str = "deepseek-ai/DeepSeek-V3",
         base_url: str = "https://api.siliconflow.cn/v1",
+        cache_db_path: str = DEFAULT_DB_PATH,
     ):
-        self.client = OpenAI(api_key=api_key, base_url=base_url)
+        self.api_key = api_key
         self.model = model
+        self.base_url = base_url
+        self._make_client()
+        self.cache = LLMCache(cache_db_path)
 
-    def _build_prompt(self, row: Dict[str, str]) -> str:
+    def _make_client(self) -> None:
+        transport = httpx.AsyncHTTPTransport(
+            http2=True,
+            retries=0,
+            limits=httpx.Limits(
+                max_connections=HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=HTTP_MAX_KEEPALIVE,
+            ),
+        )
+        self.http_client = httpx.AsyncClient(
+            transport=transport,
+            timeout=httpx.Timeout(HTTP_TIMEOUT, connect=HTTP_CONNECT_TIMEOUT),
+        )
+        self.client = AsyncOpenAI(api_key=self.api_key, base_url=self.base_url, http_client=self.http_client)
+
+    async def aclose(self) -> None:
+        try:
+            await self.http_client.aclose()
+        except Exception:
+            pass
+        # 连接池绑定在当前事件循环上；关闭后换一个新的空客户端以便再次使用
+        self._make_client()
+
+    async def __aenter__(self) -> "AIDetailSummarizer":
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        await self.aclose()
+
+    @property
+    def default_mode(self) -> str:
+        host = (self.base_url or "").lower()
+        return "online" if any(h in host for h in ONLINE_ONLY_HOSTS) else "batch"
+
+    @staticmethod
+    def _row_fields(row: Dict[str, str]) -> str:
         parts = []
         fields = [
             "项目名称",
@@ -36,7 +100,10 @@ class AIDetailSummarizer:
             v = row.get(f, "")
             if v:
                 parts.append(f"{f}：{v}")
-        body = "\n".join(parts)
+        return "\n".join(parts)
+
+    def _build_prompt(self, row: Dict[str, str]) -> str:
+        body = self._row_fields(row)
         return (
             "你是政府项目审批信息助手。根据下列字段，生成：\n"
             "1) 一个不超过120字的中文摘要，突出项目名称/审批事项/结果/日期/申报单位；\n"
@@ -45,83 +112,332 @@ class AIDetailSummarizer:
             f"字段：\n{body}\n"
         )
 
-    def _summarize_row(self, row: Dict[str, str]) -> Dict[str, str]:
-        prompt = self._build_prompt(row)
+    def _build_batched_prompt(self, rows: List[Dict[str, str]], start_id: int = 1) -> str:
+        """多行打包成一次请求，共用同一段说明，按 ITEM 编号回填。"""
+        items = [
+            f"### ITEM {i}\n字段：\n{self._row_fields(row)}"
+            for i, row in enumerate(rows, start=start_id)
+        ]
+        return (
+            "你是政府项目审批信息助手。下面每个 ITEM 是一条独立的项目记录，请分别生成：\n"
+            "1) 一个不超过120字的中文摘要，突出项目名称/审批事项/结果/日期/申报单位；\n"
+            "2) 2-4 条要点，每条以“- ”开头，涵盖金额/时间/批复/附件等关键词；\n"
+            "返回 JSON，形如 {\"results\": [{\"id\": 1, \"ai_summary\": \"...\", \"ai_points\": \"- ...\\n- ...\"}]}，"
+            "id 与 ITEM 编号一一对应，不要遗漏。\n\n"
+            + "\n\n".join(items)
+            + "\n"
+        )
+
+    def _chat_body(self, prompt: str, max_tokens: int = ROW_MAX_TOKENS) -> Dict[str, Any]:
+        return {
+            "model": self.model,
+            "messages": [
+                {"role": "system", "content": SYSTEM_PROMPT},
+                {"role": "user", "content": prompt},
+            ],
+            "temperature": 0.2,
+            "max_tokens": max_tokens,
+            "stop": STOP_SEQUENCES,
+            "response_format": {"type": "json_object"},
+        }
+
+    def _request_body(self, row: Dict[str, str]) -> Dict[str, Any]:
+        """在线请求与 Batch JSONL 共用同一组参数。"""
+        return self._chat_body(self._build_prompt(row))
+
+    @staticmethod
+    def _loads(content: str) -> Any:
+        content = (content or "").strip()
         try:
-            resp = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": "保持输出为简体中文。"},
-                    {"role": "user", "content": prompt},
-                ],
-                temperature=0.2,
-                max_tokens=400,
-            )
-            content = (resp.choices[0].message.content or "").strip()
-            if "```" in content:
-                # 容错：剥掉 code fence
-                if "```json" in content:
-                    content = content.split("```json", 1)[-1].split("```", 1)[0].strip()
-                else:
-                    content = content.split("```", 1)[-1].split("```", 1)[0].strip()
-            import json as _json
-
-            parsed = _json.loads(content)
-            return {
-                "AI摘要": parsed.get("ai_summary") or "",
-                "AI要点": parsed.get("ai_points") or "",
-            }
+            return orjson.loads(content)
+        except orjson.JSONDecodeError:
+            # 部分服务商不遵守 response_format：退回提取首个 JSON 对象
+            m = FENCE_RE.search(content)
+            if m:
+                return orjson.loads(m.group(1))
+            m = JSON_OBJECT_RE.search(content)
+            if not m:
+                raise
+            return orjson.loads(m.group(0))
+
+    @staticmethod
+    def _extras(parsed: Dict[str, Any]) -> Dict[str, str]:
+        return {
+            "AI摘要": parsed.get("ai_summary") or "",
+            "AI要点": parsed.get("ai_points") or "",
+        }
+
+    def _parse_content(self, content: str) -> Dict[str, str]:
+        return self._extras(self._loads(content))
+
+    def _parse_batched_content(self, content: str) -> Dict[int, Dict[str, str]]:
+        parsed = self._loads(content)
+        items = parsed.get("results") if isinstance(parsed, dict) else parsed
+        results: Dict[int, Dict[str, str]] = {}
+        for item in items or []:
+            if not isinstance(item, dict):
+                continue
+            try:
+                results[int(item.get("id"))] = self._extras(item)
+            except (TypeError, ValueError):
+                continue
+        return results
+
+    async def _complete(self, body: Dict[str, Any], parse: Callable[[str], Any]) -> Any:
+        """带缓存的在线请求：命中直接解析，未命中请求后仅在解析成功时写入缓存。"""
+        key = self.cache.key_for(body)
+        content = await self.cache.aget(key)
+        if content is not None:
+            return parse(content)
+        resp = await self.client.chat.completions.create(**body)
+        content = resp.choices[0].message.content or ""
+        result = parse(content)
+        await self.cache.aput(key, content)
+        return result
+
+    async def _summarize_row(self, row: Dict[str, str]) -> Dict[str, str]:
+        try:
+            return await self._complete(self._request_body(row), self._parse_content)
         except Exception:
             return {"AI摘要": "", "AI要点": ""}
 
+    async def _summarize_chunk(self, rows: List[Dict[str, str]]) -> List[Dict[str, str]]:
+        if len(rows) == 1:
+            return [await self._summarize_row(rows[0])]
+        results: Dict[int, Dict[str, str]] = {}
+        try:
+            results = await self._complete(
+                self._chat_body(self._build_batched_prompt(rows), max_tokens=ROW_MAX_TOKENS * len(rows)),
+                self._parse_batched_content,
+            )
+        except Exception:
+            results = {}
+        # 模型漏掉的条目单独补发
+        missing = [i for i in range(1, len(rows) + 1) if i not in results]
+        if missing:
+            retried = await asyncio.gather(*(self._summarize_row(rows[i - 1]) for i in missing))
+            results.update(zip(missing, retried))
+        return [results[i] for i in range(1, len(rows) + 1)]
+
+    @staticmethod
+    def _read_rows(
+        path: Path, max_rows: Optional[int]
+    ) -> Tuple[List[str], List[str], List[Dict[str, str]]]:
+        with path.open(newline="", encoding="utf-8-sig") as f:
+            reader = csv.reader(f)
+            metadata_row = next(reader, [])
+            header = next(reader, [])
+            dict_reader = csv.DictReader(f, fieldnames=header)
+            rows = list(dict_reader)
+
+        if max_rows and max_rows > 0:
+            rows = rows[:max_rows]
+        return metadata_row, header, rows
+
+    @staticmethod
+    def _ai_header(header: List[str]) -> List[str]:
+        return header + ["AI摘要", "AI要点"]
+
+    def _write_preamble(self, writer: Any, metadata_row: List[str], header: List[str]) -> None:
+        width = len(self._ai_header(header))
+        writer.writerow((metadata_row + [""] * width)[:width])
+        writer.writerow(self._ai_header(header))
+
+    @staticmethod
+    def _output_row(header: List[str], row: Dict[str, str], extras: Dict[str, str]) -> List[str]:
+        """按表头顺序拼成一行列表，交给 csv.writer（C 实现）一次写出。"""
+        return [row.get(h) or "" for h in header] + [extras.get("AI摘要", ""), extras.get("AI要点", "")]
+
+    def _write_rows(
+        self,
+        path: Path,
+        metadata_row: List[str],
+        header: List[str],
+        rows: List[Dict[str, str]],
+        extras: List[Dict[str, str]],
+    ) -> Path:
+        ai_path = path.with_name(f"{path.stem}_ai{path.suffix}")
+        with ai_path.open("w", newline="", encoding="utf-8-sig") as f:
+            writer = csv.writer(f)
+            self._write_preamble(writer, metadata_row, header)
+            writer.writerows(self._output_row(header, row, ext) for row, ext in zip(rows, extras))
+        return ai_path
+
     def run(
         self,
         csv_path: str,
         max_rows: Optional[int] = None,
-        max_workers: int = 4,
+        concurrency: int = 32,
+        progress_callback: Optional[Callable[..., None]] = None,
+        mode: Optional[str] = None,
+        batch_size: int = 8,
+    ) -> Optional[str]:
+        async def _main() -> Optional[str]:
+            async with self:
+                return await self.run_async(
+                    csv_path,
+                    max_rows=max_rows,
+                    concurrency=concurrency,
+                    progress_callback=progress_callback,
+                    mode=mode,
+                    batch_size=batch_size,
+                )
+
+        return asyncio.run(_main())
+
+    async def run_async(
+        self,
+        csv_path: str,
+        max_rows: Optional[int] = None,
+        concurrency: int = 32,
         progress_callback: Optional[Callable[..., None]] = None,
+        mode: Optional[str] = None,
+        batch_size: int = 8,
     ) -> Optional[str]:
+        """mode="online" 逐行并发请求；mode="batch" 走 Batch API；默认按 base_url 选择。"""
+        if (mode or self.default_mode) == "batch":
+            return await self.run_batch_async(csv_path, max_rows=max_rows, progress_callback=progress_callback)
+
         path = Path(csv_path)
         if not path.exists():
             return None
 
-        with path.open(newline="", encoding="utf-8-sig") as f:
-            reader = csv.reader(f)
+        if progress_callback:
+            progress_callback(stage="ai", message="AI 摘要生成中", current=0, total=max_rows or 0)
+
+        # 单个事件循环 + 信号量限流，取代固定线程池
+        concurrency = max(1, int(concurrency))
+        sem = asyncio.Semaphore(concurrency)
+
+        async def _bounded(chunk: List[Dict[str, str]]):
+            async with sem:
+                extras = await self._summarize_chunk(chunk)
+            return chunk, extras
+
+        batch_size = max(1, int(batch_size))
+        ai_path = path.with_name(f"{path.stem}_ai{path.suffix}")
+        read = 0
+        completed = 0
+        with path.open(newline="", encoding="utf-8-sig") as src, ai_path.open(
+            "w", newline="", encoding="utf-8-sig"
+        ) as dst:
+            reader = csv.reader(src)
             metadata_row = next(reader, [])
             header = next(reader, [])
-            dict_reader = csv.DictReader(f, fieldnames=header)
-            rows = list(dict_reader)
+            rows: Iterator[Dict[str, str]] = csv.DictReader(src, fieldnames=header)
+            if max_rows and max_rows > 0:
+                rows = itertools.islice(rows, max_rows)
 
-        if max_rows and max_rows > 0:
-            rows = rows[:max_rows]
+            writer = csv.writer(dst)
+            self._write_preamble(writer, metadata_row, header)
+
+            def _write_done(done) -> None:
+                nonlocal completed
+                for task in done:
+                    chunk, chunk_extras = task.result()
+                    for row, extras in zip(chunk, chunk_extras):
+                        writer.writerow(self._output_row(header, row, extras))
+                        completed += 1
+                        if completed % FLUSH_EVERY == 0:
+                            dst.flush()
+                    if progress_callback:
+                        progress_callback(stage="ai", message="AI 摘要生成中", current=completed, total=read)
 
+            # 边读边发：在途任务数有上限，不再一次性读入整份 CSV
+            pending = set()
+            while True:
+                chunk = list(itertools.islice(rows, batch_size))
+                if not chunk:
+                    break
+                read += len(chunk)
+                pending.add(asyncio.create_task(_bounded(chunk)))
+                if len(pending) >= concurrency * 2:
+                    done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                    _write_done(done)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                _write_done(done)
+
+        if progress_callback:
+            progress_callback(stage="idle", message="详情提取+AI 完成", current=completed, total=completed)
+        return str(ai_path)
+
+    def run_batch(
+        self,
+        csv_path: str,
+        max_rows: Optional[int] = None,
+        progress_callback: Optional[Callable[..., None]] = None,
+    ) -> Optional[str]:
+        async def _main() -> Optional[str]:
+            async with self:
+                return await self.run_batch_async(csv_path, max_rows=max_rows, progress_callback=progress_callback)
+
+        return asyncio.run(_main())
+
+    async def run_batch_async(
+        self,
+        csv_path: str,
+        max_rows: Optional[int] = None,
+        progress_callback: Optional[Callable[..., None]] = None,
+    ) -> Optional[str]:
+        """离线摘要：整份 CSV 一次提交到 Batch API，轮询完成后回填结果。"""
+        path = Path(csv_path)
+        if not path.exists():
+            return None
+
+        metadata_row, header, rows = self._read_rows(path, max_rows)
         total = len(rows)
         if progress_callback:
-            progress_callback(stage="ai", message="AI 摘要生成中", current=0, total=total)
+            progress_callback(stage="ai", message="AI 批量任务提交中", current=0, total=total)
 
-        enriched: List[Dict[str, str]] = []
-        completed = 0
-        with ThreadPoolExecutor(max_workers=max_workers) as executor:
-            future_map = {executor.submit(self._summarize_row, row): row for row in rows}
-            for future in as_completed(future_map):
-                row = future_map[future]
-                extras = future.result()
-                row = dict(row)
-                row.update(extras)
-                enriched.append(row)
-                completed += 1
-                if progress_callback:
-                    progress_callback(stage="ai", message="AI 摘要生成中", current=completed, total=total)
-
-        ai_header = header + ["AI摘要", "AI要点"]
-        ai_path = path.with_name(f"{path.stem}_ai{path.suffix}")
-        with ai_path.open("w", newline="", encoding="utf-8-sig") as f:
-            writer = csv.DictWriter(f, fieldnames=ai_header)
-            meta_dict = {ai_header[i]: (metadata_row[i] if i < len(metadata_row) else "") for i in range(len(ai_header))}
-            writer.writerow(meta_dict)
-            header_row = {h: h for h in ai_header}
-            writer.writerow(header_row)
-            writer.writerows(enriched)
+        lines = [
+            json.dumps(
+                {
+                    "custom_id": str(idx),
+                    "method": "POST",
+                    "url": "/v1/chat/completions",
+                    "body": self._request_body(row),
+                },
+                ensure_ascii=False,
+            )
+            for idx, row in enumerate(rows)
+        ]
+        batch_input = await self.client.files.create(
+            file=(f"{path.stem}_batch.jsonl", "\n".join(lines).encode("utf-8")),
+            purpose="batch",
+        )
+        batch = await self.client.batches.create(
+            input_file_id=batch_input.id,
+            endpoint="/v1/chat/completions",
+            completion_window=BATCH_COMPLETION_WINDOW,
+        )
+
+        while batch.status not in ("completed", "failed", "expired", "cancelled"):
+            if progress_callback:
+                counts = batch.request_counts
+                done = (counts.completed + counts.failed) if counts else 0
+                progress_callback(stage="ai", message=f"AI 批量任务处理中 ({batch.status})", current=done, total=total)
+            await asyncio.sleep(BATCH_POLL_INTERVAL)
+            batch = await self.client.batches.retrieve(batch.id)
+
+        if batch.status != "completed" or not batch.output_file_id:
+            raise RuntimeError(f"AI 批量任务未完成: {batch.status}")
+
+        output = await self.client.files.content(batch.output_file_id)
+        results: Dict[int, Dict[str, str]] = {}
+        for line in output.text.splitlines():
+            if not line.strip():
+                continue
+            try:
+                item = json.loads(line)
+                body = (item.get("response") or {}).get("body") or {}
+                content = body["choices"][0]["message"]["content"]
+                results[int(item["custom_id"])] = self._parse_content(content)
+            except Exception:
+                continue
+
+        extras = [results.get(idx) or {"AI摘要": "", "AI要点": ""} for idx in range(total)]
+        ai_path = self._write_rows(path, metadata_row, header, rows, extras)
 
         if progress_callback:
             progress_callback(stage="idle", message="详情提取+AI 完成", current=total, total=total)
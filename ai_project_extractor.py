@@ -1,15 +1,37 @@
-import sqlite3
+import asyncio
+import atexit
+import hashlib
+import queue
 import os
 import json
-import concurrent.futures
 import time
 import threading
-import collections
+import uuid
+import functools
 import re
-from decimal import Decimal
+import weakref
 from pathlib import Path
 
-from openai import OpenAI
+import httpx
+import orjson
+import tiktoken
+from openai import (
+    APIConnectionError,
+    APITimeoutError,
+    AsyncOpenAI,
+    InternalServerError,
+    RateLimitError,
+)
+from tenacity import (
+    retry,
+    retry_if_exception_type,
+    stop_after_attempt,
+    wait_random_exponential,
+)
+
+from job_registry import pid_alive
+from llm_cache import LLMCache
+from sqlite_pool import SQLitePool
 
 BASE_DIR = Path(__file__).resolve().parent
 DEFAULT_DB_PATH = str(BASE_DIR / "qn_hydrogen_monitor.db")
@@ -22,28 +44,312 @@ ALLOWED_MODELS = {
     "THUDM/GLM-4-9B-0414",
     "deepseek-ai/DeepSeek-V3",
 }
+JSON_OBJECT_RE = re.compile(r"\{.*\}", re.S)
+# 不遵守 JSON 模式的服务商常把 JSON 包在 ```json 代码块里，一次匹配取出正文
+FENCE_RE = re.compile(r"```(?:json)?\s*(\{.*?\}|\[.*?\])\s*```", re.S)
+# 整行 // 注释，以及跟在 JSON 值/逗号后的行尾注释（不碰字符串里的 http://）
+COMMENT_RE = re.compile(r"^\s*//.*$|(?<=[,{\[])[ \t]*//[^\n]*$|(?<=[\d\"\]}el])[ \t]+//[^\n]*$", re.M)
+TRAILING_COMMA_RE = re.compile(r",\s*([\]}])")
+BAD_ESCAPE_RE = re.compile(r'\\(?!["\\/bfnrt]|u[0-9a-fA-F]{4})')
+# 正文按 token 截断；tiktoken 编码表不可用（离线）时退回按字符截断
+CONTENT_TOKEN_BUDGET = 1500
+CONTENT_FALLBACK_CHARS = 2000
+# 从库里只取正文前若干字符（给段落去重留余量），不把整篇长文搬进 Python
+MAIN_TEXT_MAX_CHARS = 6000
+# 段落 4-gram Jaccard 相似度达到该值视为重复段落
+DEDUP_JACCARD = 0.9
+PARAGRAPH_SPLIT_RE = re.compile(r"\n\s*")
+# 仅对限速/超时/连接/5xx 重试：指数退避 + 抖动，避免连续空转耗光重试次数
+RETRYABLE_ERRORS = (RateLimitError, APITimeoutError, APIConnectionError, InternalServerError)
+RETRY_MAX_ATTEMPTS = 5
+RETRY_WAIT_MIN = 1
+RETRY_WAIT_MAX = 30
+# AIMD 自适应限速：遇到 429 乘性降速，连续成功若干次后小幅提速，上限为初始 rpm 的若干倍
+RPM_DECREASE_FACTOR = 0.7
+RPM_INCREASE_FACTOR = 1.05
+RPM_INCREASE_EVERY = 10
+RPM_MIN = 1
+RPM_CEILING_FACTOR = 3
+# 20 个字段的 JSON 回复一般 < 700 tokens；停止序列截住代码块结尾和模型复述输入
+EXTRACT_MAX_TOKENS = 800
+# 标题关键词判断不了的文章先用小模型分类，只有项目/招标/政策类文章才交给大模型做完整抽取
+CLASSIFIER_MODEL = "Qwen/Qwen2.5-7B-Instruct"
+CLASSIFY_TOKEN_BUDGET = 400
+ARTICLE_TYPES = ("项目", "招标", "政策", "新闻", "市场", "其他")
+SKIP_EXTRACT_TYPES = {"新闻", "市场", "其他"}
+# 标题带这些词的基本都要完整抽取，直接跳过分类调用；分类模型只判断剩下拿不准的文章
+EXTRACT_HINT_KEYWORDS = (
+    "项目", "招标", "中标", "采购", "签约", "开工", "投产", "备案", "环评", "示范",
+    "政策", "办法", "规划", "通知", "意见", "方案", "兆瓦", "MW", "亿元",
+)
+CLASSIFY_PROMPT = (
+    "将下面的氢能行业文章归为以下类别之一：项目、招标、政策、新闻、市场、其他。"
+    "只输出类别名称，不要输出其他内容。"
+)
+# 所有并发请求复用同一个 HTTP/2 连接池，免去每次 TCP+TLS 握手
+HTTP_MAX_CONNECTIONS = 256
+HTTP_MAX_KEEPALIVE = 128
+HTTP_CONNECT_TIMEOUT = 5.0
+STOP_SEQUENCES = ["\n```", "\n\nArticle"]
+# 写库线程：攒够 WRITE_BATCH_SIZE 条或空闲 WRITE_IDLE_SECONDS 秒就提交一次
+WRITE_BATCH_SIZE = 25
+WRITE_IDLE_SECONDS = 1.0
+DB_READERS = 4
+AI_FIELDS = [
+    "project_name",
+    "stage",
+    "event_date",
+    "location",
+    "capacity_mw",
+    "investment_cny",
+    "owner",
+    "energy_type",
+    "classic_quality",
+    "province",
+    "city",
+    "h2_output_tpy",
+    "h2_output_nm3_per_h",
+    "electrolyzer_count",
+    "co2_reduction_tpy",
+    "project_summary",
+    "project_overview",
+    "project_progress",
+    "article_type",
+    "numerical_data",
+]
+# 数值归一化：取第一个数字，按单位换算（金额→元，功率→MW）；round 消除浮点尾差
+NUM_RE = re.compile(r"-?\d+(?:\.\d+)?")
+UNIT_SCALES = (
+    ("亿", 1e8),
+    ("万元", 1e4),
+    ("万人民币", 1e4),
+    ("万千瓦", 10.0),
+    ("千瓦", 1e-3),
+)
+NUMERIC_FIELDS = frozenset(("capacity_mw", "investment_cny", "h2_output_tpy", "h2_output_nm3_per_h", "co2_reduction_tpy"))
+
+
+def _claim_owner_alive(owner):
+    """认领者 "pid:随机串" 所在进程是否还活着；格式不对的按过期处理。"""
+    try:
+        return pid_alive(int(owner.split(":", 1)[0]))
+    except (ValueError, AttributeError):
+        return False
+
+
+@functools.lru_cache(maxsize=None)
+def ok_update_sql(columns):
+    """只更新 AI 给出非空值的列；AI 没给的列保留原值。"""
+    sets = "".join(f"{k} = ?, " for k in columns)
+    return f"UPDATE projects_classic SET {sets}ai_model = ?, is_ai_improved = 1 WHERE id = ?"
+
+
+# 失败/跳过：追加标记（已存在则不重复），置回待处理以便下次重试
+FAIL_UPDATE_SQL = """
+UPDATE projects_classic
+SET is_ai_improved = 0,
+    project_progress = CASE
+        WHEN instr(COALESCE(project_progress, ''), ?1) > 0 THEN project_progress
+        ELSE COALESCE(project_progress, '') || ?1
+    END,
+    ai_model = ?2
+WHERE id = ?3
+"""
+
+# 固定不变的系统提示放在模块级：每次请求前缀逐字节一致，便于服务商的提示缓存命中
+SYSTEM_PROMPT = """
+你是一位氢能项目分析专家。你的任务是从提供的文本中提取结构化的氢能项目数据。
+
+请提取以下字段并以 JSON 格式返回。
+**重要提示：所有字符串字段（如摘要、概览、进展等）必须使用简体中文。严禁使用英语。**
+
+1.  **article_type** (文章类型): 将文章分类为以下之一：
+    - "项目": 具体氢能项目（规划、建设、运营）。
+    - "招标": 招标或采购公告（招标/中标）。
+    - "政策": 政府政策、法规或规划。
+    - "新闻": 一般行业新闻、市场分析或公司新闻。
+    - "市场": 市场数据、统计或报告。
+    - "其他": 其他。
+
+2.  **project_name** (项目名称): 项目的具体名称。
+    - 如果是项目列表，选择最突出的一个或标题中提到的那个。
+    - 去除 "关于"、"拟"、"一期" 等前缀。
+    - 优先使用《》内的名称（如果有）。
+
+3.  **stage** (项目阶段): 项目当前阶段。从以下选项中选择**一个**：
+    - "备案/获批/核准": 政府已核准/备案。
+    - "开工": 开始建设。
+    - "在建": 正在建设中。
+    - "投运/投产": 已投入运营/投产。
+    - "招标": 招标阶段。
+    - "中标": 中标结果公示。
+    - "签约": 签署协议。
+    - "前期/规划": 规划/谅解备忘录/框架协议。
+    - "未知": 不明确。严禁输出英文。
+
+4.  **event_date** (事件日期): 事件发生的日期 (YYYY-MM-DD)。如果未找到，使用发布日期。
+
+5.  **location** (地点): 项目地点（城市，省份）。
+
+6.  **capacity_mw** (产能_MW): 项目产能，直接返回原文中的数值+单位（例如 "5.6GW"、"20万千瓦"），不做单位换算，保持原样。
+    - 如果只出现“/年产氢”“/产量”而非装机规模，留空。
+    - 不返回列表。
+
+7.  **investment_cny** (投资_人民币): 总投资额，直接返回原文中的数值+单位（例如 "5.06亿元"、"8000万元"），不做单位换算，保持原样。
+    - 不返回列表。
+
+8.  **owner** (业主/开发商): 项目的主要开发商、投资方或业主。
+    - 寻找 "建设单位"、"投资方"、"业主"。
+
+9.  **energy_type** (能源类型): 能源来源类型。
+    - 例如："绿氢"、"蓝氢"、"风光氢"、"煤制氢"。
+    - 如果提到 "风电" 或 "光伏"，请包含。
+
+10. **classic_quality** (质量评级): 评估此项目的重要性/质量 (A, B, C)。
+    - **A**: 重要/大型项目（产能 > 100MW，投资 > 10亿元，或 "开工"/"投产"）。
+    - **B**: 中等项目。
+    - **C**: 小型或模糊的项目。
+
+11. **province** (省份): 省份名称（例如 "内蒙古"、"山东"）。
+
+12. **city** (城市): 城市名称。
+
+13. **h2_output_tpy** (氢产量_吨/年): 年产氢量，统一为吨/年；“万吨/年”需 *1e4。
+
+14. **h2_output_nm3_per_h** (氢产量_标方/小时): 统一为 Nm3/h；“万标方/小时”需 *1e4。
+
+15. **electrolyzer_count** (电解槽数量): 电解槽台/套数，填入纯数字。
+
+16. **co2_reduction_tpy** (碳减排_吨/年): 统一为吨/年；“万吨/年”需 *1e4。
+
+17. **project_summary** (项目摘要): 项目的简明摘要（最多 200 字，中文）。
+
+18. **project_overview** (项目概况): 项目范围的技术概况（建设内容）。
+    - 例如："建设 500MW 风电场和 10,000 吨/年 绿氢工厂..."
+
+19. **project_progress** (项目进展): 文本中提到的具体进展更新。
+    - 例如："11月15日签署投资协议"、"开始打桩工程"。
+
+20. **numerical_data** (数值数据汇总): 文本中发现的所有数值数据的汇总列表。
+    - 格式为带符号的列表字符串（例如："- 投资: 5亿元\\n- 产能: 200MW\\n- 氢产量: 1万吨/年"）。
+    - 必须包含单位。
+    - Capture everything: money, capacity, output, land area, dates, counts, etc。
+
+Return ONLY valid JSON.
+"""
+# 原生遵守 JSON 模式的模型：response_format 已足够，去掉提示里的英文冗余句，少算 prompt token
+JSON_NATIVE_MODELS = {"Qwen/Qwen2.5-Coder-7B-Instruct"}
+JSON_NATIVE_DROP_LINES = (
+    "    - Capture everything: money, capacity, output, land area, dates, counts, etc。\n",
+    "\nReturn ONLY valid JSON.\n",
+)
+
+
+def system_prompt_for(model):
+    """按模型特化系统提示；其余模型（如 GLM 爱加代码块）保留完整提示，靠 FENCE_RE 兜底。"""
+    if model not in JSON_NATIVE_MODELS:
+        return SYSTEM_PROMPT
+    prompt = SYSTEM_PROMPT
+    for line in JSON_NATIVE_DROP_LINES:
+        prompt = prompt.replace(line, "")
+    return prompt
+
+# 日志文件整个进程只打开一次，带缓冲写入；run 结束时 flush，进程退出时关闭
+LOG_BUFFER_SIZE = 8192
+_log_lock = threading.Lock()
+_log_file = None
+
+
+def _write_log(line):
+    global _log_file
+    with _log_lock:
+        if _log_file is None:
+            _log_file = LOG_PATH.open("a", encoding="utf-8", buffering=LOG_BUFFER_SIZE)
+            atexit.register(_log_file.close)
+        _log_file.write(line)
+
+
+# 同一秒内的日志复用格式化好的时间戳，每秒只调一次 localtime/strftime
+_ts_cache = (0, "")
+
+
+def _log_timestamp():
+    global _ts_cache
+    sec = int(time.time())
+    cached = _ts_cache
+    if sec != cached[0]:
+        cached = _ts_cache = (sec, time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(sec)))
+    return cached[1]
+
+
+def flush_log():
+    with _log_lock:
+        if _log_file is not None:
+            try:
+                _log_file.flush()
+            except Exception:
+                pass
 
 
 class RateLimiter:
-    def __init__(self, rpm: int):
+    """令牌桶限速：容量 rpm，每秒补充 rpm/60 个令牌；临界区只有几次算术运算。
+
+    rpm 会随服务端反馈自适应调整（AIMD）：429 时乘以 RPM_DECREASE_FACTOR，
+    连续 RPM_INCREASE_EVERY 次成功后乘以 RPM_INCREASE_FACTOR，不超过 ceiling。
+    """
+
+    __slots__ = ("rpm", "capacity", "rate", "tokens", "last", "lock", "ceiling", "streak")
+
+    def __init__(self, rpm: int, ceiling: int = 0):
         self.rpm = rpm
-        self.window = 60.0
-        self.times = collections.deque()
+        self.capacity = float(max(rpm or 0, 0))
+        self.rate = self.capacity / 60.0
+        self.tokens = self.capacity
+        self.last = time.monotonic()
         self.lock = threading.Lock()
+        self.ceiling = max(ceiling or 0, rpm or 0)
+        self.streak = 0
+
+    def _set_rpm(self, rpm):
+        # 调用方持有 lock
+        self.rpm = rpm
+        self.capacity = float(rpm)
+        self.rate = self.capacity / 60.0
+        self.tokens = min(self.tokens, self.capacity)
 
-    def wait(self):
+    def on_rate_limited(self):
+        if not self.rpm or self.rpm <= 0:
+            return
+        with self.lock:
+            self.streak = 0
+            self._set_rpm(max(RPM_MIN, self.rpm * RPM_DECREASE_FACTOR))
+            # 桶里剩余的令牌作废，避免降速后立刻再打一串请求
+            self.tokens = 0.0
+            self.last = time.monotonic()
+
+    def on_success(self):
+        if not self.rpm or self.rpm <= 0:
+            return
+        with self.lock:
+            self.streak += 1
+            if self.streak >= RPM_INCREASE_EVERY:
+                self.streak = 0
+                if self.rpm < self.ceiling:
+                    self._set_rpm(min(self.ceiling, self.rpm * RPM_INCREASE_FACTOR))
+
+    async def wait(self):
         if not self.rpm or self.rpm <= 0:
             return
         while True:
             with self.lock:
-                now = time.time()
-                while self.times and now - self.times[0] > self.window:
-                    self.times.popleft()
-                if len(self.times) < self.rpm:
-                    self.times.append(now)
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.last) * self.rate)
+                self.last = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
                     return
-                sleep_time = self.window - (now - self.times[0]) + 0.01
-            time.sleep(sleep_time)
+                sleep_time = (1 - self.tokens) / self.rate
+            await asyncio.sleep(sleep_time)
 
 
 class AIProjectExtractor:
@@ -56,6 +362,7 @@ class AIProjectExtractor:
         db_path=DEFAULT_DB_PATH,
         request_timeout=180,
         rpm_limit: int | None = None,
+        classifier_model=CLASSIFIER_MODEL,
     ):
         self.api_key = api_key
         self.base_url = base_url
@@ -89,11 +396,22 @@ class AIProjectExtractor:
         self._model_idx = 0
         self._model_lock = threading.Lock()
         self._bad_models = set()
+        self._system_prompts = {m: system_prompt_for(m) for m in ALLOWED_MODELS}
 
         self.db_path = db_path
-        self.client = OpenAI(api_key=api_key, base_url=base_url)
+        self.classifier_model = classifier_model
         self.request_timeout = request_timeout
+        self._make_client()
+        self.cache = LLMCache(db_path)
+        # 一条加锁的写连接 + 少量只读连接，实例回收时统一关闭
+        self.pool = SQLitePool(db_path, readers=DB_READERS)
+        weakref.finalize(self, self.pool.close)
+        self._enc = self._get_encoding()
         self.running = False
+        self._loop = None
+        self._stop = None
+        # id -> (title, url, 截断后的正文)，每轮认领后整体替换，只读
+        self._project_cache = {}
         self.rpm_limit = rpm_limit or int(os.environ.get("AI_RPM_LIMIT", "0") or 0)
         if self.rpm_limit <= 0:
             self.rpm_limit = 20
@@ -101,23 +419,104 @@ class AIProjectExtractor:
         if not hasattr(self.__class__, "_rate_limiters"):
             self.__class__._rate_limiters = {}
 
-    def log_debug(self, msg: str) -> None:
+    def _limiter_for(self, model):
+        key = f"{self.base_url}::{model}"
+        limiter = self.__class__._rate_limiters.get(key)
+        if limiter is None:
+            limiter = self.__class__._rate_limiters.setdefault(
+                key, RateLimiter(self.rpm_limit, ceiling=self.rpm_limit * RPM_CEILING_FACTOR)
+            )
+        return limiter
+
+    def _make_client(self):
+        transport = httpx.AsyncHTTPTransport(
+            http2=True,
+            retries=0,
+            limits=httpx.Limits(
+                max_connections=HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=HTTP_MAX_KEEPALIVE,
+            ),
+        )
+        self.http_client = httpx.AsyncClient(
+            transport=transport,
+            timeout=httpx.Timeout(self.request_timeout, connect=HTTP_CONNECT_TIMEOUT),
+        )
+        # 重试统一交给 _create_completion 的 tenacity 退避，SDK 自带重试关掉以免叠加
+        self.client = AsyncOpenAI(
+            api_key=self.api_key,
+            base_url=self.base_url,
+            http_client=self.http_client,
+            max_retries=0,
+        )
+
+    async def aclose(self):
         try:
-            ts = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime())
-            with LOG_PATH.open("a", encoding="utf-8") as f:
-                f.write(f"[{ts}] {msg}\n")
+            await self.http_client.aclose()
         except Exception:
             pass
+        # 连接池绑定在当前事件循环上；关闭后换一个新的空客户端，下次 run 可继续使用
+        self._make_client()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.aclose()
+
+    _encoding = None
+    _encoding_loaded = False
+
+    @classmethod
+    def _get_encoding(cls):
+        if not cls._encoding_loaded:
+            cls._encoding_loaded = True
+            try:
+                cls._encoding = tiktoken.get_encoding("cl100k_base")
+            except Exception:
+                cls._encoding = None
+        return cls._encoding
+
+    @staticmethod
+    def _dedup_paragraphs(text):
+        """去掉完全重复及近似重复（4-gram Jaccard >= DEDUP_JACCARD）的段落。"""
+        seen = set()
+        kept = []
+        kept_grams = []
+        for para in PARAGRAPH_SPLIT_RE.split(text):
+            para = para.strip()
+            if not para:
+                continue
+            digest = hashlib.blake2b(para.encode("utf-8"), digest_size=8).digest()
+            if digest in seen:
+                continue
+            seen.add(digest)
+            grams = {para[i : i + 4] for i in range(max(1, len(para) - 3))}
+            dup = False
+            for other in kept_grams:
+                inter = len(grams & other)
+                if inter and inter / len(grams | other) >= DEDUP_JACCARD:
+                    dup = True
+                    break
+            if dup:
+                continue
+            kept.append(para)
+            kept_grams.append(grams)
+        return "\n".join(kept)
+
+    def _truncate(self, text, max_tokens=CONTENT_TOKEN_BUDGET):
+        text = self._dedup_paragraphs(text or "")
+        if self._enc is None:
+            return text[:CONTENT_FALLBACK_CHARS]
+        ids = self._enc.encode(text, disallowed_special=())
+        if len(ids) <= max_tokens:
+            return text
+        return self._enc.decode(ids[:max_tokens])
 
-    def get_db_connection(self):
-        conn = sqlite3.connect(self.db_path, check_same_thread=False)
+    def log_debug(self, msg: str) -> None:
         try:
-            conn.execute("PRAGMA journal_mode=WAL;")
-            conn.execute("PRAGMA synchronous=NORMAL;")
+            _write_log(f"[{_log_timestamp()}] {msg}\n")
         except Exception:
             pass
-        conn.row_factory = sqlite3.Row
-        return conn
 
     def _next_model(self):
         with self._model_lock:
@@ -128,136 +527,44 @@ class AIProjectExtractor:
                 attempts += 1
                 if model in self._bad_models:
                     continue
-                key = f"{self.base_url}::{model}"
-                limiter = self.__class__._rate_limiters.setdefault(key, RateLimiter(self.rpm_limit))
-                return model, limiter
+                return model, self._limiter_for(model)
         raise RuntimeError("No valid models available")
 
-    def extract_project_info(self, title, content, model_name=None):
+    async def extract_project_info(self, title, content, model_name=None):
+        """content 需已由 _truncate 截断（process_single_project_once 中只截一次）。"""
         raw_response = ""
-        system_prompt = """
-你是一位氢能项目分析专家。你的任务是从提供的文本中提取结构化的氢能项目数据。
-
-请提取以下字段并以 JSON 格式返回。
-**重要提示：所有字符串字段（如摘要、概览、进展等）必须使用简体中文。严禁使用英语。**
-
-1.  **article_type** (文章类型): 将文章分类为以下之一：
-    - "项目": 具体氢能项目（规划、建设、运营）。
-    - "招标": 招标或采购公告（招标/中标）。
-    - "政策": 政府政策、法规或规划。
-    - "新闻": 一般行业新闻、市场分析或公司新闻。
-    - "市场": 市场数据、统计或报告。
-    - "其他": 其他。
-
-2.  **project_name** (项目名称): 项目的具体名称。
-    - 如果是项目列表，选择最突出的一个或标题中提到的那个。
-    - 去除 "关于"、"拟"、"一期" 等前缀。
-    - 优先使用《》内的名称（如果有）。
-
-3.  **stage** (项目阶段): 项目当前阶段。从以下选项中选择**一个**：
-    - "备案/获批/核准": 政府已核准/备案。
-    - "开工": 开始建设。
-    - "在建": 正在建设中。
-    - "投运/投产": 已投入运营/投产。
-    - "招标": 招标阶段。
-    - "中标": 中标结果公示。
-    - "签约": 签署协议。
-    - "前期/规划": 规划/谅解备忘录/框架协议。
-    - "未知": 不明确。严禁输出英文。
-
-4.  **event_date** (事件日期): 事件发生的日期 (YYYY-MM-DD)。如果未找到，使用发布日期。
-
-5.  **location** (地点): 项目地点（城市，省份）。
-
-6.  **capacity_mw** (产能_MW): 项目产能，直接返回原文中的数值+单位（例如 "5.6GW"、"20万千瓦"），不做单位换算，保持原样。
-    - 如果只出现“/年产氢”“/产量”而非装机规模，留空。
-    - 不返回列表。
-
-7.  **investment_cny** (投资_人民币): 总投资额，直接返回原文中的数值+单位（例如 "5.06亿元"、"8000万元"），不做单位换算，保持原样。
-    - 不返回列表。
-
-8.  **owner** (业主/开发商): 项目的主要开发商、投资方或业主。
-    - 寻找 "建设单位"、"投资方"、"业主"。
-
-9.  **energy_type** (能源类型): 能源来源类型。
-    - 例如："绿氢"、"蓝氢"、"风光氢"、"煤制氢"。
-    - 如果提到 "风电" 或 "光伏"，请包含。
-
-10. **classic_quality** (质量评级): 评估此项目的重要性/质量 (A, B, C)。
-    - **A**: 重要/大型项目（产能 > 100MW，投资 > 10亿元，或 "开工"/"投产"）。
-    - **B**: 中等项目。
-    - **C**: 小型或模糊的项目。
-
-11. **province** (省份): 省份名称（例如 "内蒙古"、"山东"）。
-
-12. **city** (城市): 城市名称。
-
-13. **h2_output_tpy** (氢产量_吨/年): 年产氢量，统一为吨/年；“万吨/年”需 *1e4。
-
-14. **h2_output_nm3_per_h** (氢产量_标方/小时): 统一为 Nm3/h；“万标方/小时”需 *1e4。
-
-15. **electrolyzer_count** (电解槽数量): 电解槽台/套数，填入纯数字。
-
-16. **co2_reduction_tpy** (碳减排_吨/年): 统一为吨/年；“万吨/年”需 *1e4。
-
-17. **project_summary** (项目摘要): 项目的简明摘要（最多 200 字，中文）。
-
-18. **project_overview** (项目概况): 项目范围的技术概况（建设内容）。
-    - 例如："建设 500MW 风电场和 10,000 吨/年 绿氢工厂..."
-
-19. **project_progress** (项目进展): 文本中提到的具体进展更新。
-    - 例如："11月15日签署投资协议"、"开始打桩工程"。
-
-20. **numerical_data** (数值数据汇总): 文本中发现的所有数值数据的汇总列表。
-    - 格式为带符号的列表字符串（例如："- 投资: 5亿元\\n- 产能: 200MW\\n- 氢产量: 1万吨/年"）。
-    - 必须包含单位。
-    - Capture everything: money, capacity, output, land area, dates, counts, etc。
-
-Return ONLY valid JSON.
-"""
 
         user_prompt = f"""
 Article Title: {title}
-Article Content (truncated 1000 chars):
-{content[:1000]}
+Article Content (truncated):
+{content}
 """
 
-        try:
-            response = self.client.chat.completions.create(
-                model=model_name or self.models[0],
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt},
-                ],
-                temperature=0.1,
-                max_tokens=1500,
-                extra_body={"top_k": 5, "top_p": 0.85, "repetition_penalty": 1.05},
-                timeout=self.request_timeout,
-            )
+        model_name = model_name or self.models[0]
+        body = {
+            "model": model_name,
+            "messages": [
+                {"role": "system", "content": self._system_prompts.get(model_name, SYSTEM_PROMPT)},
+                {"role": "user", "content": user_prompt},
+            ],
+            "temperature": 0.1,
+            "max_tokens": EXTRACT_MAX_TOKENS,
+            "stop": STOP_SEQUENCES,
+            "response_format": {"type": "json_object"},
+        }
+        cache_key = self.cache.key_for(body)
 
-            raw_response = response.choices[0].message.content.strip()
-            parsed = raw_response
-            if "```json" in parsed:
-                parsed = parsed.split("```json")[1].split("```")[0].strip()
-            elif "```" in parsed:
-                parsed = parsed.split("```")[1].split("```")[0].strip()
-            # Strip line comments like // ... which break json.loads
-            # Strip JS-style line comments and trailing commas, and fix bad escapes
-            lines = []
-            for line in parsed.splitlines():
-                stripped = line.strip()
-                if stripped.startswith("//"):
-                    continue
-                # drop inline // comments
-                if "//" in line:
-                    line = line.split("//", 1)[0]
-                lines.append(line)
-            cleaned = "\n".join(lines)
-            # remove trailing commas before } or ]
-            cleaned = re.sub(r",\s*([\]}])", r"\1", cleaned)
-            # escape invalid backslashes
-            cleaned = re.sub(r'\\(?!["\\/bfnrt]|u[0-9a-fA-F]{4})', r"\\\\", cleaned)
-            return json.loads(cleaned)
+        try:
+            raw_response = await self.cache.aget(cache_key) or ""
+            from_cache = bool(raw_response)
+            if not from_cache:
+                response = await self._create_completion(body)
+                raw_response = (response.choices[0].message.content or "").strip()
+            result = self._parse_response(raw_response)
+            # 只缓存新请求到且能解析的回复，解析失败的下次重试仍会真正请求
+            if not from_cache:
+                await self.cache.aput(cache_key, raw_response)
+            return result
         except Exception as e:
             msg = f"API error: {e}"
             print(msg)
@@ -265,28 +572,116 @@ Article Content (truncated 1000 chars):
                 self.log_debug(f"{msg} | model={model_name} | raw={raw_response[:500]}")
             except Exception:
                 pass
-            return {"__error": msg, "__raw": raw_response[:500], "__model": model_name}
+            return {
+                "__error": msg,
+                "__raw": raw_response[:500],
+                "__model": model_name,
+                "__rate_limited": isinstance(e, RateLimitError),
+            }
 
-    def process_single_project_once(self, project):
+    async def _classify(self, title, content):
+        """小模型粗分类，返回 ARTICLE_TYPES 中的一个；失败或无法识别时返回 None。"""
+        if not self.classifier_model or self.classifier_model in self._bad_models:
+            return None
+        if any(keyword in (title or "") for keyword in EXTRACT_HINT_KEYWORDS):
+            return None
+        body = {
+            "model": self.classifier_model,
+            "messages": [
+                {"role": "system", "content": CLASSIFY_PROMPT},
+                {"role": "user", "content": f"标题：{title}\n正文：{self._truncate(content, CLASSIFY_TOKEN_BUDGET)}"},
+            ],
+            "temperature": 0,
+            "max_tokens": 6,
+        }
+        cache_key = self.cache.key_for(body)
+        try:
+            label = await self.cache.aget(cache_key)
+            from_cache = label is not None
+            if not from_cache:
+                await self._limiter_for(self.classifier_model).wait()
+                response = await self._create_completion(body)
+                label = (response.choices[0].message.content or "").strip()
+        except Exception as e:
+            if "does not exist" in str(e).lower():
+                self._bad_models.add(self.classifier_model)
+            self.log_debug(f"classify error: {e} | model={self.classifier_model}")
+            return None
+        for article_type in ARTICLE_TYPES:
+            if article_type in label:
+                if not from_cache:
+                    await self.cache.aput(cache_key, label)
+                return article_type
+        return None
+
+    @retry(
+        retry=retry_if_exception_type(RETRYABLE_ERRORS),
+        wait=wait_random_exponential(min=RETRY_WAIT_MIN, max=RETRY_WAIT_MAX),
+        stop=stop_after_attempt(RETRY_MAX_ATTEMPTS),
+        reraise=True,
+    )
+    async def _create_completion(self, body):
+        limiter = self._limiter_for(body["model"])
+        try:
+            response = await self.client.chat.completions.create(
+                **body,
+                extra_body={"top_k": 5, "top_p": 0.85, "repetition_penalty": 1.05},
+                timeout=self.request_timeout,
+            )
+        except RateLimitError:
+            limiter.on_rate_limited()
+            self.log_debug(f"429 from {body['model']}, rpm -> {limiter.rpm:.1f}")
+            raise
+        limiter.on_success()
+        return response
+
+    @staticmethod
+    def _parse_response(raw_response):
+        try:
+            return orjson.loads(raw_response)
+        except orjson.JSONDecodeError:
+            pass
+        # Provider ignored JSON mode: pull out the first object and repair it
+        m = FENCE_RE.search(raw_response)
+        if m:
+            parsed = m.group(1)
+        else:
+            m = JSON_OBJECT_RE.search(raw_response)
+            parsed = m.group(0) if m else raw_response
+        # Strip JS-style line comments and trailing commas, and fix bad escapes
+        cleaned = COMMENT_RE.sub("", parsed)
+        cleaned = TRAILING_COMMA_RE.sub(r"\1", cleaned)
+        cleaned = BAD_ESCAPE_RE.sub(r"\\\\", cleaned)
+        return orjson.loads(cleaned)
+
+    async def process_single_project_once(self, project_id):
+        """project_id 对应的数据从只读快照 _project_cache 取，payload 只带 id。"""
         if not self.running:
             return None
 
         start_time = time.time()
-        conn = self.get_db_connection()
-        cursor = conn.cursor()
+        model_name = None
         try:
-            cursor.execute("SELECT main_text FROM articles WHERE url = ?", (project["url"],))
-            article_row = cursor.fetchone()
-            content = article_row["main_text"] if article_row and article_row["main_text"] else project["project_summary"]
+            title, _url, content = self._project_cache[project_id]
 
             if not content:
-                return {"id": project["id"], "status": "skip", "msg": "[AI跳过: 无正文]", "project": project}
+                return {"id": project_id, "status": "skip", "msg": "[AI跳过: 无正文]"}
+
+            article_type = await self._classify(title, content)
+            if article_type in SKIP_EXTRACT_TYPES:
+                return {
+                    "id": project_id,
+                    "status": "ok",
+                    "result": {"article_type": article_type, "classic_quality": "C"},
+                    "model": self.classifier_model,
+                    "elapsed": time.time() - start_time,
+                }
 
             model_name, limiter = self._next_model()
             if limiter:
-                limiter.wait()
+                await limiter.wait()
 
-            result = self.extract_project_info(project["article_title"], content, model_name=model_name)
+            result = await self.extract_project_info(title, content, model_name=model_name)
             # Normalize list responses: take first dict if available
             if isinstance(result, list):
                 result = result[0] if result and isinstance(result[0], dict) else {"__error": "invalid_list_result"}
@@ -294,7 +689,7 @@ Article Content (truncated 1000 chars):
                 err = result.get("__error", "")
                 mdl = result.get("__model")
                 status = "fail"
-                if "rate" in err.lower():
+                if result.get("__rate_limited") or "rate" in err.lower():
                     status = "rate_limit"
                 if "does not exist" in err.lower() and mdl:
                     self._bad_models.add(mdl)
@@ -303,107 +698,114 @@ Article Content (truncated 1000 chars):
                     except Exception:
                         pass
                 return {
-                    "id": project["id"],
+                    "id": project_id,
                     "status": status,
                     "msg": f"[AI失败: {err} @ {mdl or ''}]",
-                    "project": project,
                     "model": mdl or model_name,
                     "elapsed": time.time() - start_time,
                 }
             if result:
                 return {
-                    "id": project["id"],
+                    "id": project_id,
                     "status": "ok",
                     "result": result,
-                    "project": project,
                     "model": model_name,
                     "elapsed": time.time() - start_time,
                 }
             return {
-                "id": project["id"],
+                "id": project_id,
                 "status": "fail",
                 "msg": "[AI失败]",
-                "project": project,
                 "model": model_name,
                 "elapsed": time.time() - start_time,
             }
         except Exception as e:
-            print(f"Error processing project {project.get('id')}: {e}")
+            print(f"Error processing project {project_id}: {e}")
             return {
-                "id": project.get("id"),
+                "id": project_id,
                 "status": "fail",
                 "msg": "[AI失败]",
-                "project": project,
                 "model": model_name,
                 "elapsed": time.time() - start_time,
             }
-        finally:
-            conn.close()
 
-    def process_single_project(self, project):
-        res = None
-        for _ in (1, 2):
-            if not self.running:
-                return None
-            res = self.process_single_project_once(project)
-            if res and res.get("status") in ("ok", "skip", "fail"):
-                return res
-        return res
+    async def process_single_project(self, project_id):
+        # 可重试的错误已在 _create_completion 内退避重试，这里只跑一次
+        if not self.running:
+            return None
+        return await self.process_single_project_once(project_id)
+
+    def stop(self):
+        """可从任意线程调用：立即取消在途请求，已完成的结果照常落盘。"""
+        self.running = False
+        loop, stop_event = self._loop, self._stop
+        if loop is not None and stop_event is not None:
+            try:
+                loop.call_soon_threadsafe(stop_event.set)
+            except RuntimeError:
+                pass
 
-    def run(self, max_projects=10, max_workers=5, progress_callback=None):
+    def run(self, max_projects=10, concurrency=32, progress_callback=None):
+        async def _main():
+            async with self:
+                return await self._run_async(
+                    max_projects=max_projects,
+                    concurrency=concurrency,
+                    progress_callback=progress_callback,
+                )
+
+        return asyncio.run(_main())
+
+    async def _run_async(self, max_projects=10, concurrency=32, progress_callback=None):
         self.running = True
-        conn = self.get_db_connection()
-        cursor = conn.cursor()
+        self._loop = asyncio.get_running_loop()
+        self._stop = asyncio.Event()
         # Ensure ai_model column exists
         try:
-            cur = conn.execute("PRAGMA table_info(projects_classic)")
-            cols = {row[1] for row in cur.fetchall()}
+            with self.pool.reader() as rconn:
+                cols = {row[1] for row in rconn.execute("PRAGMA table_info(projects_classic)").fetchall()}
             if "ai_model" not in cols:
-                conn.execute("ALTER TABLE projects_classic ADD COLUMN ai_model TEXT")
-                conn.commit()
+                with self.pool.writer() as cur:
+                    cur.execute("ALTER TABLE projects_classic ADD COLUMN ai_model TEXT")
+            if "ai_claim_owner" not in cols:
+                with self.pool.writer() as cur:
+                    cur.execute("ALTER TABLE projects_classic ADD COLUMN ai_claim_owner TEXT")
+        except Exception:
+            pass
+        # (is_ai_improved, id) 索引：认领查询（=0 / IS NULL）和释放认领（=9）都走索引，
+        # 取代只覆盖待处理行的部分索引（articles.url 为主键，自带索引）
+        try:
+            with self.pool.writer() as cur:
+                cur.execute(
+                    "CREATE INDEX IF NOT EXISTS idx_projects_classic_claim ON projects_classic(is_ai_improved, id)"
+                )
+                cur.execute("DROP INDEX IF EXISTS idx_projects_pending")
         except Exception:
             pass
         total = 0
         completed = 0
-        max_workers = max(1, int(max_workers))
+        concurrency = max(1, int(concurrency))
         max_projects = max(0, int(max_projects))
 
-        writer_conn = self.get_db_connection()
-        writer_cur = writer_conn.cursor()
         hit_rate_limit = False
 
         def normalize_number(val, field):
-            if val is None or val == "":
+            if val is None or val == "" or isinstance(val, bool):
                 return None
-            # keep decimals stable for money
-            def to_decimal(x):
-                try:
-                    return Decimal(str(x))
-                except Exception:
-                    return None
-
-            if isinstance(val, (int, float, Decimal)):
-                d = to_decimal(val)
-                return float(d) if d is not None else None
+            if isinstance(val, (int, float)):
+                return float(val)
             if isinstance(val, str):
                 s = val.strip().replace(",", "")
-                d = to_decimal(s)
-                if d is None:
-                    m = re.search(r"([0-9]+(?:\.[0-9]+)?)", s)
-                    d = to_decimal(m.group(1)) if m else None
-                if d is None:
+                m = NUM_RE.search(s)
+                if not m:
                     return None
-                if "亿" in s:
-                    return float(d * Decimal("1e8"))
-                if "万元" in s or "万人民币" in s:
-                    return float(d * Decimal("1e4"))
-                if "万千瓦" in s:
-                    return float(d * Decimal("10"))  # 万千瓦 -> MW
-                if "千瓦" in s:
-                    return float(d / Decimal("1000"))
+                num = float(m.group())
+                for unit, scale in UNIT_SCALES:
+                    if s.find(unit) >= 0:
+                        return round(num * scale, 6)
                 if "gw" in s.lower():
-                    return float(d * Decimal("1000"))
-                return float(d)
+                    return round(num * 1000, 6)
+                return num
             return None
 
         def normalize_value(v):
@@ -414,193 +816,199 @@ Article Content (truncated 1000 chars):
                     return str(v)
             return v
 
-        def write_result(project_id, payload):
-            status = payload.get("status")
-            proj = payload.get("project", {}) or {}
+        def build_write(payload):
+            """把 worker 的 payload 转成 ("ok", (列, 参数)) 或 ("fail", 参数)；实际写库交给写库线程。"""
+            project_id = payload["id"]
             mdl = payload.get("model")
-            # Load current row to avoid wiping fields when AI returns empty
-            writer_cur.execute(
-                """
-                SELECT project_name, stage, event_date, location, capacity_mw, investment_cny,
-                       owner, energy_type, classic_quality, province, city,
-                       h2_output_tpy, h2_output_nm3_per_h, electrolyzer_count,
-                       co2_reduction_tpy, project_summary, project_overview, project_progress,
-                       article_type, numerical_data, ai_model
-                FROM projects_classic WHERE id = ?
-                """,
-                (project_id,),
-            )
-            current = writer_cur.fetchone()
-            if not current:
-                return
-            current = dict(current)
-
-            if status == "ok":
+            if payload.get("status") == "ok":
                 res = payload.get("result", {}) or {}
-                # If result is empty, treat as fail to avoid wiping with None
-                if not any(res.values()):
-                    status = "fail"
-                else:
-                    # Overwrite existing fields with AI result (clear if missing)
-                    merged = {}
-                    fields = [
-                        "project_name",
-                        "stage",
-                        "event_date",
-                        "location",
-                        "capacity_mw",
-                        "investment_cny",
-                        "owner",
-                        "energy_type",
-                        "classic_quality",
-                        "province",
-                        "city",
-                        "h2_output_tpy",
-                        "h2_output_nm3_per_h",
-                        "electrolyzer_count",
-                        "co2_reduction_tpy",
-                        "project_summary",
-                        "project_overview",
-                        "project_progress",
-                        "article_type",
-                        "numerical_data",
-                    ]
-                    for k in fields:
-                        new_val = res.get(k)
-                        if k in ("capacity_mw", "investment_cny", "h2_output_tpy", "h2_output_nm3_per_h", "co2_reduction_tpy"):
-                            norm = normalize_number(new_val, k)
-                            merged[k] = norm if norm is not None else None
-                        else:
-                            merged[k] = normalize_value(new_val) if (new_val not in (None, "")) else None
-                    if merged.get("stage") in ("Unknown", "unknown", "UNKNOWN"):
-                        merged["stage"] = "未知"
-                    writer_cur.execute(
-                        """
-                        UPDATE projects_classic 
-                        SET project_name = ?, stage = ?, event_date = ?, location = ?,
-                            capacity_mw = ?, investment_cny = ?, owner = ?, energy_type = ?,
-                            classic_quality = ?, province = ?, city = ?,
-                            h2_output_tpy = ?, h2_output_nm3_per_h = ?, electrolyzer_count = ?,
-                            co2_reduction_tpy = ?, project_summary = ?,
-                            project_overview = ?, project_progress = ?,
-                            article_type = ?, numerical_data = ?, ai_model = ?,
-                            is_ai_improved = 1
-                        WHERE id = ?
-                        """,
-                        (
-                            merged.get("project_name"),
-                            merged.get("stage"),
-                            merged.get("event_date"),
-                            merged.get("location"),
-                            merged.get("capacity_mw"),
-                            merged.get("investment_cny"),
-                            merged.get("owner"),
-                            merged.get("energy_type"),
-                            merged.get("classic_quality"),
-                            merged.get("province"),
-                            merged.get("city"),
-                            merged.get("h2_output_tpy"),
-                            merged.get("h2_output_nm3_per_h"),
-                            merged.get("electrolyzer_count"),
-                            merged.get("co2_reduction_tpy"),
-                            merged.get("project_summary"),
-                            merged.get("project_overview"),
-                            merged.get("project_progress"),
-                            merged.get("article_type"),
-                            merged.get("numerical_data"),
-                            mdl,
-                            project_id,
-                        ),
-                    )
-                    writer_conn.commit()
-                    try:
-                        self.log_debug(f"OK model={mdl} id={project_id} elapsed={payload.get('elapsed')} title={proj.get('article_title','')}")
-                    except Exception:
-                        pass
-                    return
-
-            # Failure/skip: mark as not improved so it can retry next run.
-            # Avoid duplicating the marker.
+                # 一趟循环同时得到列名和参数，不再经过中间 dict；不再先 any() 扫一遍全部字段
+                columns, params = [], []
+                for k in AI_FIELDS:
+                    new_val = res.get(k)
+                    if new_val is None or new_val == "":
+                        continue
+                    if k in NUMERIC_FIELDS:
+                        new_val = normalize_number(new_val, k)
+                        if new_val is None:
+                            continue
+                    else:
+                        new_val = normalize_value(new_val)
+                        if k == "stage" and new_val in ("Unknown", "unknown", "UNKNOWN"):
+                            new_val = "未知"
+                    columns.append(k)
+                    params.append(new_val)
+                # 没有任何可写字段时按失败处理，避免拼出空 SET 或用 None 覆盖
+                if columns:
+                    params += (mdl, project_id)
+                    return "ok", (tuple(columns), params)
             note = payload.get("msg") or "[AI失败]"
-            writer_cur.execute(
-                "SELECT project_progress FROM projects_classic WHERE id = ?", (project_id,)
-            )
-            row = writer_cur.fetchone()
-            existing = row[0] if row else ""
-            if note not in (existing or ""):
-                new_progress = (existing or "") + note
-            else:
-                new_progress = existing
-            writer_cur.execute(
-                """
-                UPDATE projects_classic
-                SET is_ai_improved = 0,
-                    project_progress = ?,
-                    ai_model = ?
-                WHERE id = ?
-                """,
-                (new_progress, mdl or payload.get("model"), project_id),
-            )
-            writer_conn.commit()
-            try:
-                self.log_debug(f"FAIL model={mdl or payload.get('model')} id={project_id} note={note} elapsed={payload.get('elapsed')}")
-            except Exception:
-                pass
-
+            return "fail", (note, mdl, project_id)
+
+        def write_batch(ok_rows, fail_rows):
+            """一个事务内写完一批：BEGIN IMMEDIATE + executemany + COMMIT。"""
+            with self.pool.writer() as cur:
+                # 按“更新了哪些列”分组，同组共用一条语句 executemany
+                groups = {}
+                for _, (columns, params) in ok_rows:
+                    groups.setdefault(columns, []).append(params)
+                for columns, params_list in groups.items():
+                    cur.executemany(ok_update_sql(columns), params_list)
+                if fail_rows:
+                    cur.executemany(FAIL_UPDATE_SQL, [p for _, p in fail_rows])
+
+        def writer_loop():
+            stop = False
+            while not stop:
+                item = write_queue.get()
+                if item is None:
+                    break
+                batch = [item]
+                while len(batch) < WRITE_BATCH_SIZE:
+                    try:
+                        item = write_queue.get(timeout=WRITE_IDLE_SECONDS)
+                    except queue.Empty:
+                        break
+                    if item is None:
+                        stop = True
+                        break
+                    batch.append(item)
+                ok_rows, fail_rows = [], []
+                for payload in batch:
+                    try:
+                        kind, params = build_write(payload)
+                    except Exception as e:
+                        self.log_debug(f"build write failed id={payload.get('id')}: {e}")
+                        continue
+                    (ok_rows if kind == "ok" else fail_rows).append((payload, params))
+                try:
+                    write_batch(ok_rows, fail_rows)
+                except Exception as e:
+                    # 整批失败时逐条重写，避免一条坏数据拖累同批其他结果
+                    self.log_debug(f"batch write failed ({len(batch)} rows), retrying one by one: {e}")
+                    for row in ok_rows:
+                        try:
+                            write_batch([row], [])
+                        except Exception as e2:
+                            self.log_debug(f"write failed id={row[0].get('id')}: {e2}")
+                    for row in fail_rows:
+                        try:
+                            write_batch([], [row])
+                        except Exception as e2:
+                            self.log_debug(f"write failed id={row[0].get('id')}: {e2}")
+                for payload, _ in ok_rows:
+                    title = self._project_cache.get(payload["id"], ("",))[0]
+                    self.log_debug(f"OK model={payload.get('model')} id={payload['id']} elapsed={payload.get('elapsed')} title={title}")
+                for payload, params in fail_rows:
+                    self.log_debug(f"FAIL model={payload.get('model')} id={payload['id']} note={params[0]} elapsed={payload.get('elapsed')}")
+
+        write_queue = queue.Queue()
+        writer = threading.Thread(target=writer_loop, name="ai-extractor-writer", daemon=True)
+        writer.start()
+
+        # 认领标记 is_ai_improved = 9 同时记下 "pid:随机串"，只释放自己的或已退出进程留下的认领
+        claim_owner = f"{os.getpid()}:{uuid.uuid4().hex}"
         try:
-            cursor.execute("UPDATE projects_classic SET is_ai_improved = 0 WHERE is_ai_improved = 9")
-            conn.commit()
-
-            cursor.execute(
-                """
-                SELECT id, article_title, project_summary, url 
-                FROM projects_classic 
-                WHERE is_ai_improved = 0 OR is_ai_improved IS NULL
-                ORDER BY id ASC
-                LIMIT ?
-                """,
-                (max_projects,),
-            )
-            projects = [dict(row) for row in cursor.fetchall()]
-
-            if projects:
-                ids = [p["id"] for p in projects]
-                cursor.execute(
-                    f"UPDATE projects_classic SET is_ai_improved = 9 WHERE id IN ({','.join(['?']*len(ids))})",
-                    ids,
+            # 单个写事务内：释放残留的过期认领，再用 UPDATE ... RETURNING 原子认领并带回正文
+            with self.pool.writer() as cur:
+                owners = [
+                    r[0]
+                    for r in cur.execute(
+                        "SELECT DISTINCT ai_claim_owner FROM projects_classic WHERE is_ai_improved = 9"
+                    ).fetchall()
+                ]
+                stale = [o for o in owners if o is not None and not _claim_owner_alive(o)]
+                # 无 owner 的认领来自加列之前的旧版本，视为过期
+                cur.execute(
+                    "UPDATE projects_classic SET is_ai_improved = 0, ai_claim_owner = NULL "
+                    "WHERE is_ai_improved = 9 AND (ai_claim_owner IS NULL OR ai_claim_owner IN "
+                    f"({', '.join('?' * len(stale)) or 'NULL'}))",
+                    stale,
                 )
-                conn.commit()
+                rows = cur.execute(
+                    """
+                    UPDATE projects_classic SET is_ai_improved = 9, ai_claim_owner = ?
+                    WHERE id IN (
+                        SELECT id FROM projects_classic
+                        WHERE is_ai_improved = 0 OR is_ai_improved IS NULL
+                        ORDER BY id ASC
+                        LIMIT ?
+                    )
+                    RETURNING id, article_title, project_summary, url,
+                        (SELECT substr(a.main_text, 1, ?) FROM articles a WHERE a.url = projects_classic.url) AS main_text
+                    """,
+                    (claim_owner, max_projects, MAIN_TEXT_MAX_CHARS),
+                ).fetchall()
+
+            def build_snapshot():
+                # 去重 + 按 token 截断只做一次，分类和抽取共用；原始正文随 rows 一起释放
+                return {
+                    row["id"]: (
+                        row["article_title"] or "",
+                        row["url"],
+                        self._truncate(row["main_text"] or row["project_summary"] or ""),
+                    )
+                    for row in rows
+                }
+
+            self._project_cache = await asyncio.to_thread(build_snapshot)
+            del rows
+            project_ids = sorted(self._project_cache)
 
-            total = len(projects)
+            total = len(project_ids)
             if progress_callback:
                 progress_callback(stage="running", message=f"发现 {total} 个待处理项目", current=0, total=total)
 
             if total == 0:
                 return
 
-            with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
-                futures = {executor.submit(self.process_single_project, p): p for p in projects}
+            # 有界工作队列：固定 concurrency 个 worker 按需取 id，不再一次性为全部项目建 task
+            work_queue = asyncio.Queue(maxsize=concurrency * 2)
+            result_queue = asyncio.Queue()
+            worker_count = min(concurrency, total)
 
-                for future in concurrent.futures.as_completed(futures):
+            async def feeder():
+                for pid in project_ids:
                     if not self.running:
-                        executor.shutdown(wait=False, cancel_futures=True)
                         break
-
-                    payload = None
+                    await work_queue.put(pid)
+                for _ in range(worker_count):
+                    await work_queue.put(None)
+
+            async def worker():
+                while True:
+                    pid = await work_queue.get()
+                    if pid is None:
+                        return
                     try:
-                        payload = future.result()
+                        payload = await self.process_single_project(pid)
                     except Exception:
-                        payload = {"status": "fail", "msg": "[AI失败]", "project": None, "id": None}
+                        payload = {"status": "fail", "msg": "[AI失败]", "id": pid}
+                    result_queue.put_nowait(payload)
+
+            async def stop_waiter():
+                # stop() 时往结果队列塞一个空值，唤醒下面阻塞的 get
+                await self._stop.wait()
+                result_queue.put_nowait(None)
+
+            tasks = [asyncio.create_task(feeder()), asyncio.create_task(stop_waiter())]
+            tasks += [asyncio.create_task(worker()) for _ in range(worker_count)]
+            try:
+                while completed < total:
+                    payload = await result_queue.get()
+                    # stop() 后立即退出，finally 会取消所有在途请求
+                    if self._stop.is_set() or not self.running:
+                        break
 
                     completed += 1
 
                     if payload and payload.get("id") is not None:
-                        write_result(payload["id"], payload)
+                        write_queue.put(payload)
 
                     if progress_callback:
                         title = ""
-                        if payload and payload.get("project"):
-                            title = payload["project"].get("article_title", "")
+                        if payload and payload.get("id") is not None:
+                            title = self._project_cache.get(payload["id"], ("",))[0]
                         progress_callback(
                             stage="running",
                             message=f"已处理: {title}",
@@ -608,27 +1016,35 @@ Article Content (truncated 1000 chars):
                             total=total,
                         )
                     if payload and payload.get("status") == "rate_limit":
+                        # Stop scheduling more; cancel remaining tasks
                         hit_rate_limit = True
-                        # Stop submitting more; cancel remaining futures
-                        executor.shutdown(wait=False, cancel_futures=True)
                         break
+            finally:
+                for t in tasks:
+                    t.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
 
         finally:
+            # 先等写库线程把队列里的结果全部落盘，再释放未处理的认领
+            write_queue.put(None)
+            await asyncio.to_thread(writer.join)
+            self._project_cache = {}
             try:
-                cursor.execute(
-                    "UPDATE projects_classic SET is_ai_improved = CASE WHEN is_ai_improved=9 THEN 0 ELSE is_ai_improved END"
-                )
-                conn.commit()
-            except Exception:
-                pass
-            conn.close()
-            try:
-                writer_conn.close()
+                with self.pool.writer() as cur:
+                    cur.execute(
+                        "UPDATE projects_classic SET is_ai_improved = 0, ai_claim_owner = NULL "
+                        "WHERE is_ai_improved = 9 AND ai_claim_owner = ?",
+                        (claim_owner,),
+                    )
             except Exception:
                 pass
             self.running = False
+            self._loop = None
+            flush_log()
             if progress_callback:
-                if hit_rate_limit:
+                if self._stop.is_set():
+                    progress_callback(stage="idle", message="AI 提取已停止", current=completed, total=total)
+                elif hit_rate_limit:
                     progress_callback(
                         stage="idle",
                         message="AI 提取出错: 触发限速，已暂停，剩余保留待处理",
@@ -1,13 +1,19 @@
 import asyncio
 import pathlib
+from array import array
 import sqlite3
+import queue
 import threading
+import time
+import traceback
 import io
 import csv as csv_std
-from typing import List
+import functools
+import itertools
 import re
 
-from flask import Flask, jsonify, render_template, request, send_file
+from flask import Flask, Response, jsonify, render_template, request, stream_with_context
+from flask.json.provider import DefaultJSONProvider
 
 from captcha_manager import CaptchaManager, start_standalone_captcha_server
 from detailed_project_extractor import DetailedProjectExtractor
@@ -17,23 +23,168 @@ from classic_project_extractor import ClassicProjectExtractor
 from hydrogen_article_text_fetcher import fetch_missing_article_texts
 from ai_project_extractor import AIProjectExtractor
 from ai_detail_summarizer import AIDetailSummarizer
+from sqlite_pool import SQLitePool
+from job_registry import JobRegistry
 import json
 import os
+import ahocorasick
+import orjson
+import numpy as np
+import pandas as pd
 
 BASE_DIR = pathlib.Path(__file__).resolve().parent
 DB_PATH = str(BASE_DIR / "qn_hydrogen_monitor.db")
 
+
+def _recreate_db(path):
+    """库文件损坏被连接池移走后：用经典提取器建表，再补上列表索引。"""
+    conn = ClassicProjectExtractor(db_path=path)._connect()
+    try:
+        for ddl in LIST_INDEXES:
+            try:
+                conn.execute(ddl)
+            except sqlite3.Error:
+                continue
+        conn.commit()
+    finally:
+        conn.close()
+
+
+# 接口共用的连接池：一条写连接（BEGIN IMMEDIATE）+ 每核一条只读连接
+db_pool = SQLitePool(DB_PATH, readers=os.cpu_count() or 4, on_recreate=_recreate_db)
+# 多个 Web 进程共用同一数据库时，靠 app_jobs 表保证同类后台任务只跑一个
+job_registry = JobRegistry(db_pool)
+
+# 列表接口的排序/筛选路径：按索引顺序走，省掉整表扫描 + 内存排序
+LIST_INDEXES = (
+    "CREATE INDEX IF NOT EXISTS idx_pc_pub_id ON projects_classic(published_at DESC, id DESC)",
+    "CREATE INDEX IF NOT EXISTS idx_pc_quality ON projects_classic(classic_quality)",
+    "CREATE INDEX IF NOT EXISTS idx_pc_srctype ON projects_classic(source_type)",
+    # 与 AI 提取器认领用的同名索引：状态接口的总数/已处理数和 AI 重置都走这个覆盖索引
+    "CREATE INDEX IF NOT EXISTS idx_projects_classic_claim ON projects_classic(is_ai_improved, id)",
+    "CREATE INDEX IF NOT EXISTS idx_articles_pub ON articles(published_at DESC, created_at DESC)",
+    # 文章列表的键集分页按 (published_at, COALESCE(created_at, ''), url) 排序，表达式要与查询逐字一致才会走索引
+    "DROP INDEX IF EXISTS idx_articles_chan_pub",
+    "CREATE INDEX IF NOT EXISTS idx_articles_chan_key ON articles(channel_id, published_at DESC, COALESCE(created_at, '') DESC, url DESC)",
+    "CREATE INDEX IF NOT EXISTS idx_articles_key ON articles(published_at DESC, COALESCE(created_at, '') DESC, url DESC)",
+)
+
+
+def ensure_list_indexes():
+    """启动时建一次索引；表还不存在（新库）时跳过，下次启动再建。"""
+    for ddl in LIST_INDEXES:
+        try:
+            with db_pool.writer() as cur:
+                cur.execute(ddl)
+        except sqlite3.Error:
+            continue
+    # 让查询规划器拿到新索引的统计信息（只分析需要的表，开销很小）
+    try:
+        with db_pool.writer() as cur:
+            cur.execute("PRAGMA optimize")
+    except sqlite3.Error:
+        pass
+
+ensure_list_indexes()
+
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """jsonify / request.get_json 改用 orjson：C 实现一次编码成 bytes，大列表响应明显更快。
+
+    orjson 不认识的类型（Decimal 等）交回 Flask 默认的 default 处理。
+    """
+
+    option = orjson.OPT_NON_STR_KEYS
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=self.default, option=self.option).decode("utf-8")
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(
+            orjson.dumps(obj, default=self.default, option=self.option), mimetype=self.mimetype
+        )
+
+
 app = Flask(__name__, template_folder="templates", static_folder="static")
+app.json = OrjsonProvider(app)
 captcha_manager = CaptchaManager()
 start_standalone_captcha_server(captcha_manager)
 app.register_blueprint(captcha_manager.create_blueprint(prefix="captcha"), url_prefix="/captcha")
 
+# 状态字典每次修改都取一个全局递增版本号，状态接口据此出 ETag，前端轮询没变化时直接 304
+_status_version = itertools.count(1)
+# 进程标识放进 ETag，重启或多进程时旧 ETag 不会误命中
+_STATUS_EPOCH = f"{os.getpid()}-{int(time.time())}"
+# 状态变化时唤醒 /api/status/stream 的所有连接；空闲时按心跳间隔发注释行保活
+_status_cond = threading.Condition()
+STATUS_STREAM_HEARTBEAT = 15
+
+
+def _notify_status():
+    with _status_cond:
+        _status_cond.notify_all()
+
+
+_MISSING = object()
+
+
+class VersionedStatus(dict):
+    """记录每个键最后一次变化时的版本号，SSE 只推送客户端上次之后变过的键。
+
+    进度回调来自后台线程、事件循环和请求线程，比较、写入和打版本号在同一把锁里完成，版本号不会倒退。
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._lock = threading.Lock()
+        self.version = next(_status_version)
+        self.changed = dict.fromkeys(self, self.version)
+
+    def __setitem__(self, key, value):
+        self.update({key: value})
+
+    def update(self, *args, **kwargs):
+        # 值没变的键不算更新，也不触发版本号和推送
+        with self._lock:
+            diff = {k: v for k, v in dict(*args, **kwargs).items() if self.get(k, _MISSING) != v}
+            if not diff:
+                return
+            super().update(diff)
+            self.version = version = next(_status_version)
+            for key in diff:
+                self.changed[key] = version
+        _notify_status()
+
+    def delta(self, since):
+        with self._lock:
+            return {k: self[k] for k, v in self.changed.items() if v > since}
+
+
+def _status_etag(*statuses):
+    return _STATUS_EPOCH + "-" + "-".join(str(st.version) for st in statuses)
+
+
+def _conditional_status(etag, build):
+    """If-None-Match 命中时不做 JSON 编码直接回 304。"""
+    if request.if_none_match.contains(etag):
+        resp = Response(status=304)
+    else:
+        resp = jsonify(build())
+    resp.set_etag(etag)
+    return resp
+
+
 collector_task = None
 extractor_task = None
-collector_status = {"stage": "idle", "message": "准备就绪", "current": 0, "total": 0}
-extractor_status = {"stage": "idle", "message": "待机", "current": 0, "total": 0}
+collector_status = VersionedStatus({"stage": "idle", "message": "准备就绪", "current": 0, "total": 0})
+extractor_status = VersionedStatus({"stage": "idle", "message": "待机", "current": 0, "total": 0})
 hydrogen_monitor_task = None
-hydrogen_monitor_status = {
+hydrogen_monitor_status = VersionedStatus({
     "stage": "idle",
     "message": "待机",
     "current": 0,
@@ -44,63 +195,176 @@ hydrogen_monitor_status = {
     "new_in_page": 0,
     "new_in_run": 0,
     "total_in_db": 0,
-}
+})
 hydrogen_channels = get_default_hydrogen_channels()
 classic_extractor_task = None
-classic_extractor_status = {
+classic_extractor_status = VersionedStatus({
     "stage": "idle",
     "message": "待机",
     "current": 0,
     "total": 0,
-}
+})
 ai_extractor_task = None
-ai_extractor_status = {
+ai_extractor_instance = None
+ai_extractor_status = VersionedStatus({
     "stage": "idle",
     "message": "待机",
     "current": 0,
     "total": 0,
-}
+})
 
 SECRETS_FILE = "secrets.json"
 
-def load_secrets():
-    if os.path.exists(SECRETS_FILE):
+# secrets.json 按 (mtime_ns, size) 缓存，文件没改就不重复读盘解析；config 为配置接口 GET 的结果
+_secrets_cache = {"mtime": None, "data": {}, "config": None}
+
+
+def _secrets_data():
+    """只读的缓存 dict，调用方不能修改；要改再保存请用 load_secrets()。"""
+    try:
+        st = os.stat(SECRETS_FILE)
+    except FileNotFoundError:
+        return {}
+    mtime = (st.st_mtime_ns, st.st_size)
+    if mtime != _secrets_cache["mtime"]:
         try:
-            with open(SECRETS_FILE, 'r') as f:
-                return json.load(f)
-        except:
+            with open(SECRETS_FILE, "rb") as f:
+                data = orjson.loads(f.read())
+        except (OSError, ValueError):
             return {}
-    return {}
+        _secrets_cache["data"] = data if isinstance(data, dict) else {}
+        _secrets_cache["config"] = None
+        _secrets_cache["mtime"] = mtime
+    return _secrets_cache["data"]
+
+
+def load_secrets():
+    # 调用方会改返回的 dict 再 save_secrets，给副本免得污染缓存
+    return dict(_secrets_data())
 
 def save_secrets(secrets):
     with open(SECRETS_FILE, 'w') as f:
         json.dump(secrets, f)
 
 
+# 所有异步后台任务共用一个常驻事件循环，不再每个任务各起线程 + asyncio.run 建/拆一次循环
+_bg_loop = None
+_bg_loop_lock = threading.Lock()
 
-def get_db_connection():
-    def _open():
-        conn = sqlite3.connect(DB_PATH)
-        conn.row_factory = sqlite3.Row
-        return conn
 
-    try:
-        return _open()
-    except sqlite3.DatabaseError as exc:
-        if "file is not a database" in str(exc):
-            backup = f"{DB_PATH}.corrupt"
-            try:
-                os.replace(DB_PATH, backup)
-            except OSError:
-                pass
-            # Recreate a fresh DB with schema
-            extractor = ClassicProjectExtractor(db_path=DB_PATH)
-            return extractor._connect()
-        raise
+def _background_loop():
+    global _bg_loop
+    with _bg_loop_lock:
+        if _bg_loop is None:
+            loop = asyncio.new_event_loop()
+            threading.Thread(target=loop.run_forever, name="app-bg-loop", daemon=True).start()
+            _bg_loop = loop
+    return _bg_loop
+
+
+def _submit_async(coro, job):
+    """把协程投递到后台事件循环，返回 concurrent.futures.Future（done() 判断是否结束）；结束时释放 job。"""
+    future = asyncio.run_coroutine_threadsafe(coro, _background_loop())
+    future.add_done_callback(_report_background_error)
+    future.add_done_callback(lambda _: job_registry.release(job))
+    return future
+
+
+def _start_thread(target, job):
+    def run():
+        try:
+            target()
+        finally:
+            job_registry.release(job)
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    return thread
+
+
+def _report_background_error(future):
+    # 线程版任务出错时会打印 traceback，这里保持一致
+    if not future.cancelled() and future.exception() is not None:
+        traceback.print_exception(future.exception())
+
+
+# 列表接口按批从游标取行，边取边编码 JSON 输出，不在内存里攒整页 dict
+STREAM_FETCH_SIZE = 256
+
+
+def _tuple_cursor(conn):
+    """只按位置取值的查询用普通元组行，绕开连接上的 sqlite3.Row。"""
+    cur = conn.cursor()
+    cur.row_factory = None
+    return cur
+
+
+def _stream_page(head, sql, params, convert=None, tail=None):
+    """流式返回 {**head, "items": [...], **tail(最后一条)}；items 由 sql 查询结果逐行 orjson 编码。
+
+    查询中途出错时响应头已发出，改在结尾对象里带 "error"，前端据此区分失败页和不满一页的结果。
+    """
+
+    def gen():
+        last = None
+        error = None
+        yield orjson.dumps(head)[:-1] + b',"items":['
+        try:
+            with db_pool.reader() as conn:
+                # 普通元组行 + 列名元组 zip，比 sqlite3.Row 按名取值快
+                cur = _tuple_cursor(conn)
+                cur.execute(sql, params)
+                cols = tuple(d[0] for d in cur.description)
+                first = True
+                for rows in iter(lambda: cur.fetchmany(STREAM_FETCH_SIZE), []):
+                    parts = []
+                    for row in rows:
+                        item = dict(zip(cols, row))
+                        if convert:
+                            convert(item)
+                        parts.append(orjson.dumps(item))
+                    yield (b"" if first else b",") + b",".join(parts)
+                    first = False
+                    last = item
+        except sqlite3.Error as e:
+            traceback.print_exc()
+            error = str(e)
+        trailer = {} if tail is None else tail(last)
+        if error is not None:
+            trailer = {**(trailer or {}), "error": error}
+        if trailer:
+            yield b"]," + orjson.dumps(trailer)[1:]
+        else:
+            yield b"]}"
 
+    return Response(stream_with_context(gen()), mimetype="application/json")
 
-def _run_async(coro):
-    asyncio.run(coro)
+
+# 分页接口的 COUNT(*) 结果缓存：键里带数据版本号，本进程写库/后台任务有进展时版本号 +1；
+# 其他进程的写入靠 TTL 兜底
+COUNT_CACHE_TTL = 30
+COUNT_CACHE_SIZE = 256
+_count_cache = {}
+_table_version = 0
+
+
+def _bump_table_version():
+    global _table_version
+    _table_version += 1
+
+
+def _cached_count(conn, sql, params):
+    key = (_table_version, sql, tuple(params))
+    now = time.monotonic()
+    hit = _count_cache.get(key)
+    if hit is not None and now - hit[1] < COUNT_CACHE_TTL:
+        return hit[0]
+    row = _tuple_cursor(conn).execute(sql, params).fetchone()
+    total = int(row[0]) if row and row[0] is not None else 0
+    if len(_count_cache) >= COUNT_CACHE_SIZE:
+        _count_cache.clear()
+    _count_cache[key] = (total, now)
+    return total
 
 
 def collector_progress(**info):
@@ -113,10 +377,12 @@ def extractor_progress(**info):
 
 def hydrogen_progress(**info):
     hydrogen_monitor_status.update(info)
+    _bump_table_version()
 
 
 def classic_progress(**info):
     classic_extractor_status.update(info)
+    _bump_table_version()
 
 
 @app.route("/")
@@ -132,7 +398,7 @@ def collector_dashboard():
 @app.route("/api/collector", methods=["POST"])
 def start_collector():
     global collector_task
-    if collector_task and collector_task.is_alive():
+    if collector_task and not collector_task.done():
         return jsonify({"ok": False, "message": "已有采集任务运行中"}), 409
 
     data = request.get_json() or {}
@@ -151,22 +417,24 @@ def start_collector():
         if not await collector.get_captcha_token_from_browser():
             return
         await collector.collect_all_projects()
-        collector.save_data()
-        collector.save_failed_pages()
+        # 事件循环与其他任务共用，同步的读写盘放到线程里做
+        await asyncio.to_thread(collector.save_data)
+        await asyncio.to_thread(collector.save_failed_pages)
         await collector.close()
         collector_progress(stage="idle", message="采集完成", current=collector.pages_completed, total=collector.processed_pages)
         collector_progress(stage="idle", message="采集完成", current=collector.pages_completed, total=collector.processed_pages)
 
+    if not job_registry.acquire("collector"):
+        return jsonify({"ok": False, "message": "其他进程已有采集任务运行中"}), 409
     collector_status.update({"stage": "running", "message": "采集中", "current": 0, "total": 0})
-    collector_task = threading.Thread(target=_run_async, args=(task(),), daemon=True)
-    collector_task.start()
+    collector_task = _submit_async(task(), job="collector")
     return jsonify({"ok": True})
 
 
 @app.route("/api/extractor", methods=["POST"])
 def start_extractor():
     global extractor_task
-    if extractor_task and extractor_task.is_alive():
+    if extractor_task and not extractor_task.done():
         return jsonify({"ok": False, "message": "已有提取任务运行中"}), 409
 
     data = request.get_json() or {}
@@ -193,17 +461,19 @@ def start_extractor():
             ai_max_rows = None
     except (TypeError, ValueError):
         ai_max_rows = None
-    ai_max_workers = data.get("ai_max_workers") or 4
+    # 前端沿用 ai_max_workers 字段，含义为 AI 并发请求数
+    ai_concurrency = data.get("ai_max_workers") or 32
     try:
-        ai_max_workers = int(ai_max_workers)
-        if ai_max_workers <= 0:
-            ai_max_workers = 4
+        ai_concurrency = int(ai_concurrency)
+        if ai_concurrency <= 0:
+            ai_concurrency = 32
     except (TypeError, ValueError):
-        ai_max_workers = 4
+        ai_concurrency = 32
     ai_model = data.get("ai_model")
 
     async def task():
-        extractor.load_and_filter_csv()
+        # 事件循环与其他任务共用，pandas 过滤和写 CSV 放到线程里做
+        await asyncio.to_thread(extractor.load_and_filter_csv)
         if not extractor.filtered_projects:
             extractor_progress(stage="idle", message="无匹配项目", current=0, total=0)
             return
@@ -211,10 +481,10 @@ def start_extractor():
         if not await extractor.get_captcha_token():
             return
         await extractor.extract_all_projects()
-        output_file = extractor.save_extracted_data()
+        output_file = await asyncio.to_thread(extractor.save_extracted_data)
         await extractor.close()
         if use_ai and output_file:
-            secrets = load_secrets()
+            secrets = _secrets_data()
             api_key = secrets.get("SILICONFLOW_API_KEY")
             model = ai_model or secrets.get("SILICONFLOW_MODEL", "deepseek-ai/DeepSeek-V3")
             if not api_key:
@@ -225,27 +495,31 @@ def start_extractor():
                 def _cb(**kw):
                     extractor_progress(**kw)
                 # AI 摘要生成
-                summarizer.run(output_file, max_rows=ai_max_rows, max_workers=int(ai_max_workers), progress_callback=_cb)
+                async with summarizer:
+                    await summarizer.run_async(output_file, max_rows=ai_max_rows, concurrency=ai_concurrency, progress_callback=_cb)
             except Exception as e:
                 extractor_progress(stage="idle", message=f"提取完成（AI 失败: {e}）", current=len(extractor.filtered_projects), total=len(extractor.filtered_projects))
                 return
         extractor_progress(stage="idle", message="提取完成", current=len(extractor.filtered_projects), total=len(extractor.filtered_projects))
 
+    if not job_registry.acquire("extractor"):
+        return jsonify({"ok": False, "message": "其他进程已有提取任务运行中"}), 409
     extractor_status.update({"stage": "running", "message": "提取中", "current": 0, "total": 0})
-    extractor_task = threading.Thread(target=_run_async, args=(task(),), daemon=True)
-    extractor_task.start()
+    extractor_task = _submit_async(task(), job="extractor")
     return jsonify({"ok": True})
 
 
 @app.route("/api/status")
 def get_status():
-    return jsonify(
-        {
+    statuses = (collector_status, extractor_status, hydrogen_monitor_status, classic_extractor_status)
+    return _conditional_status(
+        _status_etag(*statuses),
+        lambda: {
             "collector": collector_status,
             "extractor": extractor_status,
             "hydrogen_monitor": hydrogen_monitor_status,
             "classic_extractor": classic_extractor_status,
-        }
+        },
     )
 
 
@@ -302,11 +576,6 @@ def start_hydrogen_monitor():
     if not enabled_channels:
         return jsonify({"ok": False, "message": "当前没有启用的氢能频道"}), 400
 
-    monitor = QNHydrogenMonitor(
-        channels=enabled_channels,
-        progress_callback=hydrogen_progress,
-    )
-
     def task():
         try:
             hydrogen_progress(
@@ -321,23 +590,69 @@ def start_hydrogen_monitor():
                 new_in_run=0,
                 total_in_db=0,
             )
-            monitor.run_once(
-                max_new_articles=max_new_articles,
-                max_pages_per_channel=max_pages_per_channel,
-            )
+            # 整个任务只用一条从连接池借出的连接，PRAGMA 不必每次重新设置
+            with db_pool.checkout() as conn:
+                monitor = QNHydrogenMonitor(
+                    channels=enabled_channels,
+                    progress_callback=hydrogen_progress,
+                    db_conn=conn,
+                )
+                monitor.run_once(
+                    max_new_articles=max_new_articles,
+                    max_pages_per_channel=max_pages_per_channel,
+                )
         except Exception as e:
             hydrogen_progress(stage="idle", message=f"监控任务出错: {e}")
         finally:
             hydrogen_progress(stage="idle", message="监控任务完成")
 
-    hydrogen_monitor_task = threading.Thread(target=task, daemon=True)
-    hydrogen_monitor_task.start()
+    if not job_registry.acquire("hydrogen"):
+        return jsonify({"ok": False, "message": "其他进程已有氢能监控任务运行中"}), 409
+    hydrogen_monitor_task = _start_thread(task, job="hydrogen")
     return jsonify({"ok": True})
 
 
+@app.route("/api/status/stream")
+def stream_status():
+    """SSE 推送 /api/status 的内容：首条为全量，之后只发变化过的键，由前端合并。"""
+    statuses = {
+        "collector": collector_status,
+        "extractor": extractor_status,
+        "hydrogen_monitor": hydrogen_monitor_status,
+        "classic_extractor": classic_extractor_status,
+    }
+
+    def gen():
+        last = None
+        seen = dict.fromkeys(statuses, 0)
+        while True:
+            etag = _status_etag(*statuses.values())
+            if etag != last:
+                last = etag
+                payload = {}
+                for name, st in statuses.items():
+                    version = st.version
+                    if version > seen[name]:
+                        payload[name] = st.delta(seen[name])
+                        seen[name] = version
+                yield b"data: " + orjson.dumps(payload) + b"\n\n"
+            with _status_cond:
+                changed = _status_cond.wait_for(
+                    lambda: _status_etag(*statuses.values()) != last, timeout=STATUS_STREAM_HEARTBEAT
+                )
+            if not changed:
+                yield b": ping\n\n"
+
+    return Response(
+        gen(),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @app.route("/api/hydrogen/status")
 def get_hydrogen_status():
-    return jsonify(hydrogen_monitor_status)
+    return _conditional_status(_status_etag(hydrogen_monitor_status), lambda: hydrogen_monitor_status)
 
 
 @app.route("/api/hydrogen/articles", methods=["POST"])
@@ -360,70 +675,71 @@ def get_hydrogen_articles():
         page_size = 20
     offset = (page - 1) * page_size
 
-    try:
-        conn = sqlite3.connect(DB_PATH)
-        conn.row_factory = sqlite3.Row
-        cur = conn.cursor()
-        where = ""
-        params = []
+    clauses = []
+    params = []
+    if channel_ids:
+        if isinstance(channel_ids, str):
+            channel_ids = [channel_ids]
+        channel_ids = [str(c) for c in channel_ids if c]
         if channel_ids:
-            if isinstance(channel_ids, str):
-                channel_ids = [channel_ids]
-            channel_ids = [str(c) for c in channel_ids if c]
-            if channel_ids:
-                placeholders = ",".join("?" for _ in channel_ids)
-                where = f" WHERE channel_id IN ({placeholders})"
-                params.extend(channel_ids)
-        cur.execute(f"SELECT COUNT(*) AS c FROM articles{where}", params)
-        row = cur.fetchone()
-        total = int(row["c"]) if row and row["c"] is not None else 0
-        cur.execute(
-            f"""
-            SELECT url, channel_id, channel_label, title, published_at
-            FROM articles
-            {where}
-            ORDER BY published_at DESC, created_at DESC
-            LIMIT ? OFFSET ?
-            """,
-            params + [page_size, offset],
-        )
-        items = [
-            {
-                "url": r["url"],
-                "channel_id": r["channel_id"],
-                "channel_label": r["channel_label"],
-                "title": r["title"],
-                "published_at": r["published_at"],
-            }
-            for r in cur.fetchall()
-        ]
+            placeholders = ",".join("?" for _ in channel_ids)
+            clauses.append(f"channel_id IN ({placeholders})")
+            params.extend(channel_ids)
+    where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+    try:
+        with db_pool.reader() as conn:
+            total = _cached_count(conn, f"SELECT COUNT(*) FROM articles{where}", params)
     except sqlite3.Error:
-        total = 0
-        items = []
-    finally:
-        try:
-            conn.close()
-        except Exception:
-            pass
+        return jsonify({"total": 0, "items": [], "page": page, "page_size": page_size})
+
+    # 带上一页返回的 next_cursor 时走键集分页，深翻页不再让 sqlite 读完再丢掉 OFFSET 行；
+    # published_at 可能为空，空值排在最后；created_at 为空按 '' 比较，否则行值比较得到 NULL 会漏掉这些行
+    cursor = payload.get("cursor")
+    if isinstance(cursor, dict) and cursor.get("url") is not None:
+        created_at = cursor.get("created_at") or ""
+        if cursor.get("published_at") is not None:
+            clauses.append("((published_at, COALESCE(created_at, ''), url) < (?, ?, ?) OR published_at IS NULL)")
+            params.extend([cursor["published_at"], created_at, cursor["url"]])
+        else:
+            clauses.append("(published_at IS NULL AND (COALESCE(created_at, ''), url) < (?, ?))")
+            params.extend([created_at, cursor["url"]])
+        offset = 0
+    where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+
+    return _stream_page(
+        {"total": total, "page": page, "page_size": page_size},
+        f"""
+        SELECT url, channel_id, channel_label, title, published_at, created_at
+        FROM articles
+        {where}
+        ORDER BY published_at DESC, COALESCE(created_at, '') DESC, url DESC
+        LIMIT ? OFFSET ?
+        """,
+        params + [page_size, offset],
+        tail=_article_cursor,
+    )
 
-    return jsonify({"total": total, "items": items, "page": page, "page_size": page_size})
+
+def _article_cursor(last):
+    if not last:
+        return {"next_cursor": None}
+    return {
+        "next_cursor": {
+            "published_at": last["published_at"],
+            "created_at": last["created_at"],
+            "url": last["url"],
+        }
+    }
 
 
 @app.route("/api/hydrogen/articles/reset", methods=["POST"])
 def reset_hydrogen_articles():
-    conn = None
     try:
-        conn = sqlite3.connect(DB_PATH)
-        cur = conn.cursor()
-        cur.execute("DELETE FROM articles")
-        conn.commit()
+        with db_pool.writer() as cur:
+            cur.execute("DELETE FROM articles")
     except sqlite3.Error as exc:
-        if conn is not None:
-            conn.rollback()
         return jsonify({"ok": False, "error": str(exc)}), 500
-    finally:
-        if conn is not None:
-            conn.close()
+    _bump_table_version()
 
     hydrogen_monitor_status.update(
         {
@@ -473,11 +789,6 @@ def run_classic_extractor():
     if max_workers > 32:
         max_workers = 32
 
-    extractor = ClassicProjectExtractor(
-        db_path="qn_hydrogen_monitor.db",
-        progress_callback=classic_progress,
-    )
-
     def task():
         try:
             # Reset status including error url
@@ -485,322 +796,252 @@ def run_classic_extractor():
             
             # 先通过 Playwright 抓取缺失或占位的正文，再执行经典规则提取
             fetch_missing_article_texts(
-                db_path="qn_hydrogen_monitor.db",
+                db_path=DB_PATH,
                 headless=bool(headless),
                 max_concurrent=max_workers,
                 max_articles=max_articles,
                 progress_callback=classic_progress,
             )
             classic_progress(stage="running", message="经典规则提取启动", current=0, total=0)
-            extractor.run(
-                max_articles=max_articles,
-                score_threshold=score_threshold,
-                max_workers=max_workers,
-            )
+            with db_pool.checkout() as conn:
+                extractor = ClassicProjectExtractor(
+                    db_path=DB_PATH,
+                    progress_callback=classic_progress,
+                    db_conn=conn,
+                )
+                extractor.run(
+                    max_articles=max_articles,
+                    score_threshold=score_threshold,
+                    max_workers=max_workers,
+                )
         except Exception as e:
             classic_progress(stage="idle", message=f"经典提取出错: {e}")
         finally:
             if classic_extractor_status.get("stage") != "idle":
                 classic_progress(stage="idle", message="经典提取结束")
 
-    classic_extractor_task = threading.Thread(target=task, daemon=True)
-    classic_extractor_task.start()
+    if not job_registry.acquire("classic"):
+        return jsonify({"ok": False, "message": "其他进程已有经典项目提取任务运行中"}), 409
+    classic_extractor_task = _start_thread(task, job="classic")
     return jsonify({"ok": True})
 
 
-@app.route("/api/hydrogen/projects/classic/status")
-def get_classic_extractor_status():
+def _classic_counts():
+    """一次扫描同时得到总数和已 AI 处理数。"""
     try:
-        conn = get_db_connection()
-        cur = conn.cursor()
-        cur.execute("SELECT COUNT(*) FROM projects_classic")
-        total = cur.fetchone()[0]
-        cur.execute("SELECT COUNT(*) FROM projects_classic WHERE is_ai_improved = 1")
-        ai_done = cur.fetchone()[0]
+        with db_pool.reader() as conn:
+            row = _tuple_cursor(conn).execute(
+                "SELECT COUNT(*), COALESCE(SUM(is_ai_improved = 1), 0) FROM projects_classic"
+            ).fetchone()
+        return row[0], row[1]
     except Exception:
-        total = 0
-        ai_done = 0
+        return 0, 0
+
+
+@app.route("/api/hydrogen/projects/classic/status")
+def get_classic_extractor_status():
+    total, ai_done = _classic_counts()
     return jsonify({**classic_extractor_status, "classic_total": total, "ai_done": ai_done})
 
 
-@app.route('/api/hydrogen/projects/classic/list', methods=['GET', 'POST'])
-def list_classic_projects():
-    try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        # Get parameters from JSON body (POST) or query string (GET)
-        data = {}
-        if request.method == 'POST' and request.is_json:
-            data = request.get_json()
+CLASSIC_LIST_COLUMNS = (
+    "id", "url", "channel_id", "channel_label", "article_title", "published_at",
+    "project_name", "stage", "event_date", "location",
+    "capacity_mw", "investment_cny", "product_category",
+    "owner", "energy_type", "classic_quality",
+    "province", "city",
+    "h2_output_tpy", "h2_output_nm3_per_h", "electrolyzer_count", "co2_reduction_tpy",
+    "project_summary", "source_type", "project_overview", "project_progress",
+    "user_note", "is_ai_improved", "article_type", "numerical_data",
+)
+CLASSIC_LIST_SELECT = ", ".join(CLASSIC_LIST_COLUMNS)
+CLASSIC_TYPE_CLAUSES = {
+    "single": "source_type = 'single'",
+    "list": "source_type IN ('list', 'list_item')",
+}
+# (参数名, WHERE 子句, 取值方式)；顺序即位掩码的位序
+CLASSIC_FILTERS = (
+    ("overview", "(project_overview LIKE ? OR project_summary LIKE ?)", "like2"),
+    ("progress", "project_progress LIKE ?", "like"),
+    ("date_from", "published_at >= ?", "raw"),
+    ("date_to", "published_at <= ?", "raw"),
+    ("channel", "channel_label LIKE ?", "like"),
+    ("title", "article_title LIKE ?", "like"),
+    ("name", "project_name LIKE ?", "like"),
+    ("stage", "stage LIKE ?", "like"),
+    ("event_from", "event_date >= ?", "raw"),
+    ("event_to", "event_date <= ?", "raw"),
+    ("location", "location LIKE ?", "like"),
+    ("province", "province LIKE ?", "like"),
+    ("city", "city LIKE ?", "like"),
+    ("owner", "owner LIKE ?", "like"),
+    ("product", "product_category LIKE ?", "like"),
+    ("energy", "energy_type LIKE ?", "like"),
+    ("link", "url LIKE ?", "like"),
+    ("quality", "classic_quality = ?", "upper"),
+    ("search_article_type", "article_type LIKE ?", "like"),
+    ("search_numerical", "numerical_data LIKE ?", "like"),
+    ("cap_min", "capacity_mw >= ?", "float"),
+    ("cap_max", "capacity_mw <= ?", "float"),
+    ("inv_min", "investment_cny >= ?", "float"),
+    ("inv_max", "investment_cny <= ?", "float"),
+    ("h2tpy_min", "h2_output_tpy >= ?", "float"),
+    ("h2tpy_max", "h2_output_tpy <= ?", "float"),
+    ("h2nm3_min", "h2_output_nm3_per_h >= ?", "float"),
+    ("h2nm3_max", "h2_output_nm3_per_h <= ?", "float"),
+    ("elec_min", "electrolyzer_count >= ?", "float"),
+    ("elec_max", "electrolyzer_count <= ?", "float"),
+    ("co2_min", "co2_reduction_tpy >= ?", "float"),
+    ("co2_max", "co2_reduction_tpy <= ?", "float"),
+)
+
+CLASSIC_FILTER_INDEX = {key: (bit, kind) for bit, (key, _clause, kind) in enumerate(CLASSIC_FILTERS)}
+
+
+def _parse_classic_filters(data):
+    """一趟遍历请求参数，只处理出现的筛选键；返回 (位掩码, 按位序排好的参数)。"""
+    found = {}
+    for key, raw in data.items():
+        spec = CLASSIC_FILTER_INDEX.get(key)
+        if spec is None or raw is None:
+            continue
+        bit, kind = spec
+        if kind == "float":
+            if raw == "":
+                continue
+            try:
+                found[bit] = (float(raw),)
+            except (TypeError, ValueError):
+                continue
+            continue
+        value = str(raw).strip()
+        if not value:
+            continue
+        if kind == "upper":
+            found[bit] = (value.upper(),)
+        elif kind == "raw":
+            found[bit] = (value,)
         else:
-            data = request.args
-
-        def get_param(key, default=''):
-            return str(data.get(key, default)).strip()
-
-        # Get filter parameters
-        f_type = get_param('type').lower()
-        f_overview = get_param('overview').lower()
-        f_progress = get_param('progress').lower()
-        f_date_from = get_param('date_from')
-        f_date_to = get_param('date_to')
-        f_channel = get_param('channel').lower()
-        f_title = get_param('title').lower()
-        f_name = get_param('name').lower()
-        f_stage = get_param('stage').lower()
-        f_event_from = get_param('event_from')
-        f_event_to = get_param('event_to')
-        f_location = get_param('location').lower()
-        f_province = get_param('province').lower()
-        f_city = get_param('city').lower()
-        f_owner = get_param('owner').lower()
-        f_product = get_param('product').lower()
-        f_energy = get_param('energy').lower()
-        f_quality = get_param('quality').upper()
-        f_quality = get_param('quality').upper()
-        f_link = get_param('link').lower()
-        f_article_type = get_param('search_article_type').lower()
-        f_numerical = get_param('search_numerical').lower()
-        
-        # Numeric filters
-        def get_float(key):
-            v = data.get(key)
-            if v is not None and v != '':
-                try:
-                    return float(v)
-                except ValueError:
-                    return None
-            return None
+            like = f"%{value.lower()}%"
+            found[bit] = (like, like) if kind == "like2" else (like,)
+    mask = 0
+    params = []
+    for bit in sorted(found):
+        mask |= 1 << bit
+        params.extend(found[bit])
+    return mask, params
+
+
+@functools.lru_cache(maxsize=256)
+def _classic_list_sql(type_clause, mask):
+    """按 (类型子句, 筛选位掩码) 生成并缓存 (计数 SQL, 分页 SQL)。"""
+    where_clauses = [type_clause] if type_clause else []
+    where_clauses += [clause for bit, (_, clause, _) in enumerate(CLASSIC_FILTERS) if mask >> bit & 1]
+    where_sql = "WHERE " + " AND ".join(where_clauses) if where_clauses else ""
+    count_sql = f"SELECT COUNT(*) FROM projects_classic {where_sql}"
+    page_sql = (
+        f"SELECT {CLASSIC_LIST_SELECT} FROM projects_classic {where_sql} "
+        "ORDER BY published_at DESC, id DESC LIMIT ? OFFSET ?"
+    )
+    return count_sql, page_sql
 
-        f_cap_min = get_float('cap_min')
-        f_cap_max = get_float('cap_max')
-        f_inv_min = get_float('inv_min')
-        f_inv_max = get_float('inv_max')
-        f_h2tpy_min = get_float('h2tpy_min')
-        f_h2tpy_max = get_float('h2tpy_max')
-        f_h2nm3_min = get_float('h2nm3_min')
-        f_h2nm3_max = get_float('h2nm3_max')
-        f_elec_min = get_float('elec_min')
-        f_elec_max = get_float('elec_max')
-        f_co2_min = get_float('co2_min')
-        f_co2_max = get_float('co2_max')
-
-        # Build query
-        where_clauses = []
-        params = []
-
-        if f_type:
-            if f_type == 'single':
-                where_clauses.append("source_type = 'single'")
-            elif f_type == 'list':
-                where_clauses.append("source_type IN ('list', 'list_item')")
-        
-        if f_overview:
-            where_clauses.append("(project_overview LIKE ? OR project_summary LIKE ?)")
-            params.extend([f'%{f_overview}%', f'%{f_overview}%'])
-        
-        if f_progress:
-            where_clauses.append("project_progress LIKE ?")
-            params.append(f'%{f_progress}%')
-
-        if f_date_from:
-            where_clauses.append("published_at >= ?")
-            params.append(f_date_from)
-        if f_date_to:
-            where_clauses.append("published_at <= ?")
-            params.append(f_date_to)
-
-        if f_channel:
-            where_clauses.append("channel_label LIKE ?")
-            params.append(f'%{f_channel}%')
-        
-        if f_title:
-            where_clauses.append("article_title LIKE ?")
-            params.append(f'%{f_title}%')
-            
-        if f_name:
-            where_clauses.append("project_name LIKE ?")
-            params.append(f'%{f_name}%')
-            
-        if f_stage:
-            where_clauses.append("stage LIKE ?")
-            params.append(f'%{f_stage}%')
-            
-        if f_event_from:
-            where_clauses.append("event_date >= ?")
-            params.append(f_event_from)
-        if f_event_to:
-            where_clauses.append("event_date <= ?")
-            params.append(f_event_to)
-            
-        if f_location:
-            where_clauses.append("location LIKE ?")
-            params.append(f'%{f_location}%')
-            
-        if f_province:
-            where_clauses.append("province LIKE ?")
-            params.append(f'%{f_province}%')
-            
-        if f_city:
-            where_clauses.append("city LIKE ?")
-            params.append(f'%{f_city}%')
-            
-        if f_owner:
-            where_clauses.append("owner LIKE ?")
-            params.append(f'%{f_owner}%')
-            
-        if f_product:
-            where_clauses.append("product_category LIKE ?")
-            params.append(f'%{f_product}%')
-            
-        if f_energy:
-            where_clauses.append("energy_type LIKE ?")
-            params.append(f'%{f_energy}%')
-            
-        if f_link:
-            where_clauses.append("url LIKE ?")
-            params.append(f'%{f_link}%')
-            
-        if f_quality:
-            where_clauses.append("classic_quality = ?")
-            params.append(f_quality)
 
-        if f_article_type:
-            where_clauses.append("article_type LIKE ?")
-            params.append(f'%{f_article_type}%')
-            
-        if f_numerical:
-            where_clauses.append("numerical_data LIKE ?")
-            params.append(f'%{f_numerical}%')
-
-        # Numeric ranges
-        if f_cap_min is not None:
-            where_clauses.append("capacity_mw >= ?")
-            params.append(f_cap_min)
-        if f_cap_max is not None:
-            where_clauses.append("capacity_mw <= ?")
-            params.append(f_cap_max)
-            
-        if f_inv_min is not None:
-            where_clauses.append("investment_cny >= ?")
-            params.append(f_inv_min)
-        if f_inv_max is not None:
-            where_clauses.append("investment_cny <= ?")
-            params.append(f_inv_max)
-            
-        if f_h2tpy_min is not None:
-            where_clauses.append("h2_output_tpy >= ?")
-            params.append(f_h2tpy_min)
-        if f_h2tpy_max is not None:
-            where_clauses.append("h2_output_tpy <= ?")
-            params.append(f_h2tpy_max)
-            
-        if f_h2nm3_min is not None:
-            where_clauses.append("h2_output_nm3_per_h >= ?")
-            params.append(f_h2nm3_min)
-        if f_h2nm3_max is not None:
-            where_clauses.append("h2_output_nm3_per_h <= ?")
-            params.append(f_h2nm3_max)
-            
-        if f_elec_min is not None:
-            where_clauses.append("electrolyzer_count >= ?")
-            params.append(f_elec_min)
-        if f_elec_max is not None:
-            where_clauses.append("electrolyzer_count <= ?")
-            params.append(f_elec_max)
-            
-        if f_co2_min is not None:
-            where_clauses.append("co2_reduction_tpy >= ?")
-            params.append(f_co2_min)
-        if f_co2_max is not None:
-            where_clauses.append("co2_reduction_tpy <= ?")
-            params.append(f_co2_max)
+def _classic_item(item):
+    item["is_ai_improved"] = bool(item["is_ai_improved"])
 
-        where_sql = "WHERE " + " AND ".join(where_clauses) if where_clauses else ""
 
-        # Pagination
-        try:
-            page = int(get_param('page', 1))
-        except ValueError:
-            page = 1
-        try:
-            page_size = int(get_param('page_size', 20))
-        except ValueError:
-            page_size = 20
+@app.route('/api/hydrogen/projects/classic/list', methods=['GET', 'POST'])
+def list_classic_projects():
+    try:
+        with db_pool.reader() as conn:
+            # Get parameters from JSON body (POST) or query string (GET)
+            data = {}
+            if request.method == 'POST' and request.is_json:
+                data = request.get_json()
+            else:
+                data = request.args
+
+            def get_param(key, default=''):
+                return str(data.get(key, default)).strip()
+
+            # 按出现的筛选项算位掩码，同一组合复用缓存的 SQL 文本（也命中 sqlite 语句缓存）
+            f_type = get_param('type').lower()
+            mask, params = _parse_classic_filters(data)
+            count_sql, page_sql = _classic_list_sql(CLASSIC_TYPE_CLAUSES.get(f_type, ""), mask)
+
+            # Pagination
+            try:
+                page = int(get_param('page', 1))
+            except ValueError:
+                page = 1
+            try:
+                page_size = int(get_param('page_size', 20))
+            except ValueError:
+                page_size = 20
             
-        offset = (page - 1) * page_size
-
-        # Count total
-        cursor.execute(f"SELECT COUNT(*) FROM projects_classic {where_sql}", params)
-        total = cursor.fetchone()[0]
-
-        # Query with limit
-        cursor.execute(
-            f"""
-                SELECT url, channel_id, channel_label, article_title, published_at,
-                       project_name, stage, event_date, location,
-                       capacity_mw, investment_cny, product_category,
-                       owner, energy_type, classic_quality,
-                       province, city,
-                       h2_output_tpy, h2_output_nm3_per_h, electrolyzer_count, co2_reduction_tpy,
-                       project_summary, source_type, project_overview, project_progress,
-                       user_note, is_ai_improved, article_type, numerical_data, id
-                FROM projects_classic
-                {where_sql}
-                ORDER BY published_at DESC, id DESC
-                LIMIT ? OFFSET ?
-            """,
-            params + [page_size, offset]
-        )
-        rows = cursor.fetchall()
-        
-        # Convert to list of dicts
-        results = []
-        for row in rows:
-            results.append({
-                "id": row['id'],
-                "url": row['url'],
-                "channel_id": row['channel_id'],
-                "channel_label": row['channel_label'],
-                "article_title": row['article_title'],
-                "published_at": row['published_at'],
-                "project_name": row['project_name'],
-                "stage": row['stage'],
-                "event_date": row['event_date'],
-                "location": row['location'],
-                "capacity_mw": row['capacity_mw'],
-                "investment_cny": row['investment_cny'],
-                "product_category": row['product_category'],
-                "owner": row['owner'],
-                "energy_type": row['energy_type'],
-                "classic_quality": row['classic_quality'],
-                "province": row['province'],
-                "city": row['city'],
-                "h2_output_tpy": row['h2_output_tpy'],
-                "h2_output_nm3_per_h": row['h2_output_nm3_per_h'],
-                "electrolyzer_count": row['electrolyzer_count'],
-                "co2_reduction_tpy": row['co2_reduction_tpy'],
-                "project_summary": row['project_summary'],
-                "source_type": row['source_type'],
-                "project_overview": row['project_overview'],
-                "project_progress": row['project_progress'],
-                "user_note": row['user_note'],
-                "is_ai_improved": bool(row['is_ai_improved']),
-                "article_type": row['article_type'],
-                "numerical_data": row['numerical_data'],
-            })
-        
-        return jsonify({"total": total, "items": results})
+            offset = (page - 1) * page_size
+
+            # Count total
+            total = _cached_count(conn, count_sql, params)
+
+            # Query with limit; rows are streamed straight to JSON
+            return _stream_page(
+                {"total": total},
+                page_sql,
+                params + [page_size, offset],
+                convert=_classic_item,
+            )
     except Exception as e:
-        import traceback
         traceback.print_exc()
         return jsonify({"error": str(e), "trace": traceback.format_exc()}), 500
-    finally:
+
+
+# 备注编辑很频繁：请求只入队，后台线程每 ~100ms 把队列里的修改合并成一个写事务
+NOTE_FLUSH_SECONDS = 0.1
+NOTE_BATCH_SIZE = 500
+_note_queue = queue.Queue()
+_note_writer = None
+_note_writer_lock = threading.Lock()
+
+
+def _note_writer_loop():
+    while True:
+        batch = [_note_queue.get()]
+        while len(batch) < NOTE_BATCH_SIZE:
+            try:
+                batch.append(_note_queue.get_nowait())
+            except queue.Empty:
+                break
+        # 同一条记录多次修改只保留最后一次
+        latest = {}
+        for note, project_id in batch:
+            latest[project_id] = note
+        rows = [(note, project_id) for project_id, note in latest.items()]
         try:
-            conn.close()
-        except:
-            pass
+            _write_notes(rows)
+        except Exception as e:
+            # 整批失败时逐条重写，避免一条坏数据拖累同批其他修改
+            print(f"update user_note batch failed ({len(rows)} rows), retrying one by one: {e}")
+            for row in rows:
+                try:
+                    _write_notes([row])
+                except Exception as e2:
+                    print(f"update user_note failed id={row[1]}: {e2}")
+        _bump_table_version()
+        time.sleep(NOTE_FLUSH_SECONDS)
+
+
+def _write_notes(rows):
+    with db_pool.writer() as cur:
+        cur.executemany("UPDATE projects_classic SET user_note = ? WHERE id = ?", rows)
+
+
+def _ensure_note_writer():
+    global _note_writer
+    with _note_writer_lock:
+        if _note_writer is None or not _note_writer.is_alive():
+            _note_writer = threading.Thread(target=_note_writer_loop, name="note-writer", daemon=True)
+            _note_writer.start()
 
 
 @app.route('/api/hydrogen/projects/classic/update_note', methods=['POST'])
@@ -811,17 +1052,15 @@ def update_classic_project_note():
     
     if not project_id:
         return jsonify({"error": "Missing project ID"}), 400
+    # 写入在后台线程里批量执行，类型不对的请求必须在这里拒绝，不能进队列
+    if not isinstance(project_id, int) or isinstance(project_id, bool):
+        return jsonify({"error": "Invalid project ID"}), 400
+    if note is not None and not isinstance(note, str):
+        return jsonify({"error": "Invalid note"}), 400
         
-    conn = get_db_connection()
-    try:
-        cursor = conn.cursor()
-        cursor.execute("UPDATE projects_classic SET user_note = ? WHERE id = ?", (note, project_id))
-        conn.commit()
-        return jsonify({"ok": True})
-    except sqlite3.Error as e:
-        return jsonify({"error": str(e)}), 500
-    finally:
-        conn.close()
+    _ensure_note_writer()
+    _note_queue.put((note, project_id))
+    return jsonify({"ok": True}), 202
 
 @app.route("/classic-projects")
 def classic_projects_full():
@@ -830,18 +1069,14 @@ def classic_projects_full():
 
 @app.route("/api/hydrogen/projects/classic/reset", methods=["POST"])
 def reset_classic_projects():
-    conn = None
     try:
-        conn = sqlite3.connect(DB_PATH)
-        cur = conn.cursor()
-        cur.execute("DELETE FROM projects_classic")
-        cur.execute(
-            "UPDATE articles SET classic_score=0, worth_classic=0, classic_quality=NULL"
-        )
-        conn.commit()
+        with db_pool.writer() as cur:
+            cur.execute("DELETE FROM projects_classic")
+            cur.execute(
+                "UPDATE articles SET classic_score=0, worth_classic=0, classic_quality=NULL"
+            )
+        _bump_table_version()
     except sqlite3.Error as exc:
-        if conn is not None:
-            conn.rollback()
         classic_extractor_status.update(
             {
                 "stage": "idle",
@@ -851,9 +1086,6 @@ def reset_classic_projects():
             }
         )
         return jsonify({"ok": False, "error": str(exc)}), 500
-    finally:
-        if conn is not None:
-            conn.close()
 
     classic_extractor_status.update(
         {
@@ -871,99 +1103,269 @@ def details_full_view():
     return render_template("detail_full.html")
 
 
+def _read_csv_frame(path, skip_first=None):
+    """用 pandas 的 C 解析器整表读入 CSV：全部按字符串读，缺失为 ''，超出表头的多余列丢弃。
+
+    skip_first=True 跳过首行（元数据行）；None 时仅当首格为 METADATA 才跳过。
+    返回 (表头, DataFrame, 行文本索引)；每行拼接后转小写的文本放在索引里随解析结果一起缓存，
+    请求里不再逐行拼接/转小写。
+    """
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        reader = csv_std.reader(f)
+        first = next(reader, None)
+        if not first:
+            return [], None, None
+        if skip_first is None:
+            skip_first = first[0] == "METADATA"
+        header = next(reader, None) if skip_first else first
+    if not header:
+        return [], None, None
+    df = pd.read_csv(
+        path,
+        encoding="utf-8-sig",
+        skiprows=1 if skip_first else 0,
+        dtype=str,
+        na_filter=False,
+        usecols=range(len(header)),
+    )
+    # pandas 会改写空列名/重名列，这里换回文件里的原始表头
+    df.columns = header
+    text = df.iloc[:, 0].str.cat([df.iloc[:, i] for i in range(1, df.shape[1])], sep=" ").str.lower()
+    return header, df, RowTextIndex(text.tolist())
+
+
+# 中文关键词多为两个字，用二元组；比 N 短的关键词无法用索引，退回全表扫描
+NGRAM_SIZE = 2
+# 每个文件最多记住这么多个关键词的命中行
+KEYWORD_ROWS_CACHE_SIZE = 512
+
+
+class RowTextIndex:
+    """CSV 行文本（拼接后转小写）上的关键词索引，随解析结果一起缓存。
+
+    每个关键词命中哪些行只算一次并记住：前端一次增删一个标签时，只有新出现的词需要扫描，
+    其余词直接复用。新词先用 n-gram 倒排表求交集缩小候选行，再用 Aho-Corasick 一遍确认。
+    """
+
+    def __init__(self, texts):
+        self.texts = texts
+        self._postings = None
+        self._keyword_rows = {}
+        self._lock = threading.Lock()
+
+    def _build_postings(self):
+        postings = {}
+        n = NGRAM_SIZE
+        for row, text in enumerate(self.texts):
+            for gram in {text[i:i + n] for i in range(len(text) - n + 1)}:
+                rows = postings.get(gram)
+                if rows is None:
+                    rows = postings[gram] = array("I")
+                rows.append(row)
+        return postings
+
+    def _candidates(self, words):
+        """这些词可能命中的行号；有词短于 NGRAM_SIZE 时返回 None（需全表扫描）。"""
+        if any(len(w) < NGRAM_SIZE for w in words):
+            return None
+        with self._lock:
+            if self._postings is None:
+                self._postings = self._build_postings()
+        postings = self._postings
+        n = NGRAM_SIZE
+        found = set()
+        for word in words:
+            lists = sorted((postings.get(word[i:i + n], ()) for i in range(len(word) - n + 1)), key=len)
+            if not lists[0]:
+                continue
+            rows = set(lists[0])
+            for other in lists[1:]:
+                rows.intersection_update(other)
+                if not rows:
+                    break
+            found |= rows
+        return sorted(found)
+
+    def rows_with(self, words):
+        """{词: 含该词的行号 frozenset}；已查过的词直接取缓存，新词合在一起只扫一遍。"""
+        result, missing = {}, []
+        with self._lock:
+            for word in words:
+                hit = self._keyword_rows.get(word)
+                if hit is None:
+                    missing.append(word)
+                else:
+                    result[word] = hit
+        missing = list(dict.fromkeys(missing))
+        if not missing:
+            return result
+        automaton = ahocorasick.Automaton()
+        for word in missing:
+            automaton.add_word(word, word)
+        automaton.make_automaton()
+        hits = {word: set() for word in missing}
+        candidates = self._candidates(missing)
+        texts = self.texts
+        for row in range(len(texts)) if candidates is None else candidates:
+            for _end, word in automaton.iter(texts[row]):
+                hits[word].add(row)
+        with self._lock:
+            for word, rows in hits.items():
+                result[word] = self._keyword_rows[word] = frozenset(rows)
+            while len(self._keyword_rows) > KEYWORD_ROWS_CACHE_SIZE:
+                self._keyword_rows.pop(next(iter(self._keyword_rows)))
+        return result
+
+
+# 解析好的 CSV 按 (mtime, size) 缓存，筛选条件变化时不必重新解析；只保留最近用过的几份
+CSV_CACHE_SIZE = 8
+_csv_cache = {}
+_csv_cache_lock = threading.Lock()
+
+
+def _cached_csv_frame(path, skip_first=None):
+    """_read_csv_frame 的缓存版：文件修改时间或大小变了才重新解析。返回的 DataFrame 只读共享。"""
+    path = os.path.abspath(path)
+    stat = os.stat(path)
+    key = (path, skip_first)
+    with _csv_cache_lock:
+        hit = _csv_cache.pop(key, None)
+        if hit is not None and hit[0] == (stat.st_mtime_ns, stat.st_size):
+            _csv_cache[key] = hit
+            return hit[1]
+    parsed = _read_csv_frame(path, skip_first)
+    with _csv_cache_lock:
+        _csv_cache[key] = ((stat.st_mtime_ns, stat.st_size), parsed)
+        while len(_csv_cache) > CSV_CACHE_SIZE:
+            # dict 按插入顺序，命中时会重新插入，最前面的就是最久未用的
+            _csv_cache.pop(next(iter(_csv_cache)))
+    return parsed
+
+
+def _csv_page_window(payload):
+    """可选分页参数 offset/limit；不传 limit 时返回全部结果（现有页面在前端自己分页筛选）。"""
+    try:
+        offset = max(0, int(payload.get("offset") or 0))
+    except (TypeError, ValueError):
+        offset = 0
+    try:
+        limit = int(payload["limit"]) if payload.get("limit") is not None else None
+    except (TypeError, ValueError):
+        limit = None
+    if limit is not None and limit < 1:
+        limit = None
+    return offset, limit
+
+
+def _frame_records(df, index, keywords, exclude, mask=None, offset=0, limit=None):
+    """关键词标签和排除词都是“或”逻辑：命中任一关键词、且不含任一排除词的行保留。
+
+    各词的命中行来自 index 的缓存，组合成布尔数组后与向量化的 mask 相与；
+    返回 (当前窗口的行, 命中总数)，只把窗口内的行转成 dict。
+    """
+    keep = np.ones(len(df), dtype=bool) if mask is None else mask.to_numpy(dtype=bool, copy=True)
+    if keywords or exclude:
+        rows = index.rows_with(keywords + exclude)
+        if keywords:
+            included = np.zeros(len(df), dtype=bool)
+            for word in keywords:
+                included[list(rows[word])] = True
+            keep &= included
+        for word in exclude:
+            keep[list(rows[word])] = False
+    df = df[keep]
+    total = len(df)
+    if offset or limit is not None:
+        df = df.iloc[offset:None if limit is None else offset + limit]
+    return df.to_dict("records"), total
+
+
+def _csv_page_response(rows, total, offset, limit, **extra):
+    body = {**extra, "rows": rows, "total": total}
+    if offset or limit is not None:
+        body.update(offset=offset, limit=limit)
+    return jsonify(body)
+
+
 @app.route("/api/data", methods=["POST"])
 def get_data():
     csv_path = pathlib.Path("inner_mongolia_projects.csv")
     if not csv_path.exists():
         return jsonify({"rows": [], "total": 0})
-    import csv as csv_mod
     payload = request.get_json() or {}
     keywords = [k.lower() for k in (payload.get("keywords") or []) if k]
     exclude = [k.lower() for k in (payload.get("exclude") or []) if k]
-    cbs_filter = {c.strip() for c in (payload.get("cbsnums") or []) if c.strip()}
-    rows: List[dict] = []
-    with csv_path.open(newline="", encoding="utf-8-sig") as f:
-        reader = csv_mod.reader(f)
-        meta = next(reader, None)
-        header = next(reader, None)
-        if not header:
+    cbs_filter = frozenset(c.strip() for c in (payload.get("cbsnums") or []) if c.strip())
+    offset, limit = _csv_page_window(payload)
+    header, df, index = _cached_csv_frame(csv_path, skip_first=True)
+    if df is None:
+        return jsonify({"rows": [], "total": 0})
+    mask = None
+    # cbsnum 精确匹配整列向量化比较，与关键词结果相与
+    if cbs_filter:
+        if 'cbsnum' not in header:
             return jsonify({"rows": [], "total": 0})
-        dict_reader = csv_mod.DictReader(f, fieldnames=header)
-        for row in dict_reader:
-            cbs = (row.get('cbsnum') or '').strip()
-            if '?' in cbs and cbs == 'cbsnum':
-                continue
-            text = ' '.join((value or '') for value in row.values()).lower()
-            # 关键词标签采用“或”逻辑：任一关键词命中即可
-            if keywords and not any(k in text for k in keywords):
-                continue
-            # 排除词仍然是“或”逻辑：包含任一排除词则排除
-            if exclude and any(k in text for k in exclude):
-                continue
-            if cbs_filter and cbs not in cbs_filter:
-                continue
-            rows.append(row)
-    return jsonify({"rows": rows, "total": len(rows)})
+        mask = df['cbsnum'].str.strip().isin(cbs_filter)
+    # 关键词标签采用“或”逻辑：任一关键词命中即可；排除词同样任一命中即排除
+    rows, total = _frame_records(df, index, keywords, exclude, mask, offset, limit)
+    return _csv_page_response(rows, total, offset, limit)
+
+
+# 前端会频繁刷新文件列表，结果短暂缓存
+DETAIL_FILES_TTL = 1.0
+_detail_files_cache = {"at": 0.0, "files": []}
 
 
 @app.route("/api/detail-files")
 def get_detail_files():
-    import glob, os as _os
-    files = glob.glob("detailed_project_data_*.csv")
-    files = sorted(files, key=lambda p: _os.path.getmtime(p), reverse=True)
-    return jsonify({"files": files})
+    now = time.monotonic()
+    if now - _detail_files_cache["at"] >= DETAIL_FILES_TTL:
+        # scandir 的 DirEntry 自带 stat 信息，不用对每个文件再单独 getmtime
+        with os.scandir(".") as it:
+            entries = [
+                (e.name, e.stat().st_mtime)
+                for e in it
+                if e.name.startswith("detailed_project_data_") and e.name.endswith(".csv") and e.is_file()
+            ]
+        entries.sort(key=lambda t: t[1], reverse=True)
+        _detail_files_cache["files"] = [name for name, _ in entries]
+        _detail_files_cache["at"] = now
+    return jsonify({"files": _detail_files_cache["files"]})
 
 
 @app.route("/api/detail-data", methods=["POST"])
 def get_detail_data():
-    import csv as csv_mod
     payload = request.get_json() or {}
     filename = payload.get("file")
     if not filename or not pathlib.Path(filename).exists():
         return jsonify({"header": [], "rows": [], "total": 0})
     keywords = [k.lower() for k in (payload.get("keywords") or []) if k]
     exclude = [k.lower() for k in (payload.get("exclude") or []) if k]
-    rows = []
-    header = []
-    with open(filename, newline="", encoding="utf-8-sig") as f:
-        reader = list(csv_mod.reader(f))
-        if not reader:
-            return jsonify({"header": [], "rows": [], "total": 0})
-        # 兼容旧格式（首行 METADATA）与新格式（首行为表头，元数据行在末尾）
-        if reader[0] and reader[0][0] == "METADATA":
-            if len(reader) < 2:
-                return jsonify({"header": [], "rows": [], "total": 0})
-            header = reader[1]
-            data_rows = reader[2:]
-        else:
-            header = reader[0]
-            data_rows = reader[1:]
-        filtered_data = []
-        for r in data_rows:
-            if r and r[0] == "METADATA":
-                continue
-            row_dict = {header[i]: (r[i] if i < len(r) else "") for i in range(len(header))}
-            text = " ".join((value or "") for value in row_dict.values()).lower()
-            if keywords and not any(k in text for k in keywords):
-                continue
-            if exclude and any(k in text for k in exclude):
-                continue
-            filtered_data.append(row_dict)
-        rows = filtered_data
-    return jsonify({"header": header, "rows": rows, "total": len(rows)})
+    offset, limit = _csv_page_window(payload)
+    # 兼容旧格式（首行 METADATA）与新格式（首行为表头，元数据行在末尾）
+    header, df, index = _cached_csv_frame(filename)
+    if df is None:
+        return jsonify({"header": [], "rows": [], "total": 0})
+    rows, total = _frame_records(df, index, keywords, exclude, df.iloc[:, 0] != "METADATA", offset, limit)
+    return _csv_page_response(rows, total, offset, limit, header=header)
 
 
 @app.route("/api/config/siliconflow", methods=["GET", "POST", "DELETE"])
 def siliconflow_config():
     if request.method == "GET":
-        secrets = load_secrets()
-        key = secrets.get("SILICONFLOW_API_KEY")
-        model = secrets.get("SILICONFLOW_MODEL", "deepseek-ai/DeepSeek-V3")
-        return jsonify({
-            "has_key": bool(key),
-            "key_masked": f"{key[:4]}...{key[-4:]}" if key else None,
-            "model": model
-        })
+        secrets = _secrets_data()
+        config = _secrets_cache["config"] if secrets else None
+        if config is None:
+            key = secrets.get("SILICONFLOW_API_KEY")
+            model = secrets.get("SILICONFLOW_MODEL", "deepseek-ai/DeepSeek-V3")
+            config = {
+                "has_key": bool(key),
+                "key_masked": f"{key[:4]}...{key[-4:]}" if key else None,
+                "model": model
+            }
+            if secrets:
+                _secrets_cache["config"] = config
+        return jsonify(config)
     
     if request.method == "POST":
         data = request.get_json() or {}
@@ -988,15 +1390,16 @@ def siliconflow_config():
 
 def ai_progress(**info):
     ai_extractor_status.update(info)
+    _bump_table_version()
 
 
 @app.route("/api/hydrogen/projects/ai/run", methods=["POST"])
 def run_ai_extractor():
-    global ai_extractor_task
+    global ai_extractor_task, ai_extractor_instance
     if ai_extractor_task and ai_extractor_task.is_alive():
         return jsonify({"ok": False, "message": "AI提取任务正在运行中"}), 409
 
-    secrets = load_secrets()
+    secrets = _secrets_data()
     api_key = secrets.get("SILICONFLOW_API_KEY")
     default_models = (
         "Qwen/Qwen2.5-7B-Instruct Qwen/Qwen2-7B-Instruct "
@@ -1008,83 +1411,84 @@ def run_ai_extractor():
         return jsonify({"ok": False, "message": "未配置API Key"}), 400
 
     payload = request.get_json() or {}
-    max_projects = payload.get("max_projects", 10)
+    # 参数在请求线程里一次解析好，非法值回落默认，任务线程里不再做类型转换
+    try:
+        max_projects = int(payload.get("max_projects", 10))
+    except (TypeError, ValueError):
+        max_projects = 10
     # Reuse the UI “每分钟请求上限” field as a per-minute request cap to avoid rate limits.
-    rpm_limit = int(payload.get("max_workers", 20))  # default conservative to stay under TPM
-    # Derive worker pool: per-model cap times number of models to keep batches flowing
+    try:
+        rpm_limit = max(1, int(payload.get("max_workers", 20)))  # default conservative to stay under TPM
+    except (TypeError, ValueError):
+        rpm_limit = 20
+    # Derive in-flight cap: per-model rpm times number of models to keep batches flowing
     model_list = [m for m in re.split(r"[,\s]+", str(model).strip()) if m]
-    worker_count = max(1, rpm_limit * max(1, len(model_list)))
+    concurrency = max(1, rpm_limit * max(1, len(model_list)))
 
     def task():
+        global ai_extractor_instance
         try:
-            extractor = AIProjectExtractor(api_key, models=model, rpm_limit=int(rpm_limit), request_timeout=180)
+            extractor = AIProjectExtractor(api_key, models=model, rpm_limit=rpm_limit, request_timeout=180)
+            ai_extractor_instance = extractor
             ai_progress(stage="running", message="AI提取启动", current=0, total=0)
             extractor.run(
-                max_projects=int(max_projects),
-                max_workers=worker_count,
+                max_projects=max_projects,
+                concurrency=concurrency,
                 progress_callback=ai_progress,
             )
         except Exception as e:
             ai_progress(stage="idle", message=f"AI提取出错: {e}")
         finally:
+            ai_extractor_instance = None
             if ai_extractor_status.get("stage") != "idle":
                 ai_progress(stage="idle", message="AI提取结束")
 
-    ai_extractor_task = threading.Thread(target=task, daemon=True)
-    ai_extractor_task.start()
+    if not job_registry.acquire("ai"):
+        return jsonify({"ok": False, "message": "其他进程已有AI提取任务运行中"}), 409
+    ai_extractor_task = _start_thread(task, job="ai")
+    return jsonify({"ok": True})
+
+
+@app.route("/api/hydrogen/projects/ai/stop", methods=["POST"])
+def stop_ai_extractor():
+    extractor = ai_extractor_instance
+    if not extractor or not (ai_extractor_task and ai_extractor_task.is_alive()):
+        return jsonify({"ok": False, "message": "AI提取任务未在运行"}), 409
+    extractor.stop()
     return jsonify({"ok": True})
 
 
 @app.route("/api/hydrogen/projects/ai/status")
 def get_ai_extractor_status():
-    try:
-        conn = get_db_connection()
-        cur = conn.cursor()
-        cur.execute("SELECT COUNT(*) FROM projects_classic")
-        total = cur.fetchone()[0]
-        cur.execute("SELECT COUNT(*) FROM projects_classic WHERE is_ai_improved = 1")
-        ai_done = cur.fetchone()[0]
-    except Exception:
-        total = 0
-        ai_done = 0
+    total, ai_done = _classic_counts()
     return jsonify({**ai_extractor_status, "classic_total": total, "ai_done": ai_done})
 
 @app.route("/api/hydrogen/projects/ai/reset", methods=["POST"])
 def reset_ai_projects():
-    conn = get_db_connection()
     try:
-        cur = conn.execute("SELECT url FROM projects_classic WHERE is_ai_improved = 1")
-        urls = [row["url"] for row in cur.fetchall()]
-        deleted = 0
-        if urls:
-            with conn:
-                conn.execute("DELETE FROM projects_classic WHERE is_ai_improved = 1")
-                conn.executemany(
-                    "UPDATE articles SET classic_score=0, worth_classic=0, classic_quality=NULL WHERE url=?",
-                    [(u,) for u in urls],
-                )
-            deleted = len(urls)
+        with db_pool.writer() as cur:
+            # 先按子查询回退文章标记，再删项目；两条语句同一事务，不再把 URL 取回 Python
+            cur.execute(
+                "UPDATE articles SET classic_score=0, worth_classic=0, classic_quality=NULL "
+                "WHERE url IN (SELECT url FROM projects_classic WHERE is_ai_improved = 1)"
+            )
+            deleted = cur.execute("DELETE FROM projects_classic WHERE is_ai_improved = 1").rowcount
+        _bump_table_version()
         return jsonify({"ok": True, "deleted": deleted})
     except Exception as exc:
         return jsonify({"ok": False, "message": str(exc)}), 500
-    finally:
-        conn.close()
+
+
+# 导出时每攒够这么多字符才编码输出一块，避免每批几百行就向客户端写一次小块
+EXPORT_CHUNK_CHARS = 64 * 1024
 
 
 @app.route("/api/hydrogen/projects/classic/export")
 def export_classic_projects():
-    conn = get_db_connection()
-    rows = []
-    try:
-        cur = conn.execute("SELECT * FROM projects_classic ORDER BY published_at DESC NULLS LAST")
-        rows = cur.fetchall()
-    except Exception:
-        cur = conn.execute("SELECT * FROM projects_classic ORDER BY published_at DESC")
-        rows = cur.fetchall()
-    finally:
-        conn.close()
-
-    if not rows:
+    with db_pool.reader() as conn:
+        has_rows = conn.execute("SELECT 1 FROM projects_classic LIMIT 1").fetchone()
+        existing = {row[1] for row in conn.execute("PRAGMA table_info(projects_classic)")}
+    if not has_rows:
         return jsonify({"ok": False, "message": "暂无数据可导出"}), 404
 
     columns = [
@@ -1117,26 +1521,51 @@ def export_classic_projects():
         ("文章标题", "article_title"),
     ]
 
-    def normalize(row):
-        data = dict(row)
-        # Boolean to Y/N
-        ai_val = data.get("is_ai_improved")
-        if ai_val in (1, True, "1", "true", "True"):
-            data["is_ai_improved"] = "Y"
+    # 列顺序和 AI 标记的 Y/空 转换都交给 SQL，查询结果逐行直接写 CSV；表里没有的列导出为空
+    select = []
+    for _, key in columns:
+        if key not in existing:
+            select.append("''")
+        elif key == "is_ai_improved":
+            select.append("CASE WHEN is_ai_improved IN (1, '1', 'true', 'True') THEN 'Y' ELSE '' END")
         else:
-            data["is_ai_improved"] = ""
-        return data
-
-    buf = io.StringIO()
-    writer = csv_std.writer(buf)
-    writer.writerow([cn for cn, _ in columns])
-    for r in rows:
-        d = normalize(r)
-        writer.writerow([d.get(key, "") for _, key in columns])
-
-    mem = io.BytesIO(buf.getvalue().encode("utf-8-sig"))
-    mem.seek(0)
-    return send_file(mem, mimetype="text/csv", as_attachment=True, download_name="hydrogen_projects_full.csv")
+            select.append(key)
+    select_sql = "SELECT " + ", ".join(select) + " FROM projects_classic ORDER BY published_at DESC"
+
+    def generate():
+        # 边查边写：行格式化进同一个缓冲区，攒到 EXPORT_CHUNK_CHARS 再编码输出并清空，不在内存里攒整张表
+        buf = io.StringIO()
+        writer = csv_std.writer(buf)
+        writer.writerow([cn for cn, _ in columns])
+        yield buf.getvalue().encode("utf-8-sig")
+        buf.seek(0)
+        buf.truncate()
+        with db_pool.reader() as conn:
+            cur = _tuple_cursor(conn)
+            try:
+                cur.execute(select_sql + " NULLS LAST")
+            except Exception:
+                cur.execute(select_sql)
+            try:
+                while True:
+                    batch = cur.fetchmany(STREAM_FETCH_SIZE)
+                    if not batch:
+                        break
+                    writer.writerows(batch)
+                    if buf.tell() >= EXPORT_CHUNK_CHARS:
+                        yield buf.getvalue().encode("utf-8")
+                        buf.seek(0)
+                        buf.truncate()
+            finally:
+                cur.close()
+        if buf.tell():
+            yield buf.getvalue().encode("utf-8")
+
+    return Response(
+        generate(),
+        mimetype="text/csv",
+        headers={"Content-Disposition": "attachment; filename=hydrogen_projects_full.csv"},
+    )
 
 
 if __name__ == "__main__":
@@ -8,15 +8,14 @@ class CaptchaManager:
 
     def __init__(self):
         self._lock = threading.Lock()
-        self._image = None
-        self._created_at = None
+        # (image_bytes, created_at) 整体替换发布：网页轮询直接读引用，不用拿锁
+        self._state = (None, None)
         self._code = None
         self._event = threading.Event()
 
     def set_image(self, image_bytes: bytes):
         with self._lock:
-            self._image = image_bytes
-            self._created_at = time.time()
+            self._state = (image_bytes, time.time())
             self._code = None
             self._event.clear()
 
@@ -38,16 +37,15 @@ class CaptchaManager:
         return True
 
     def get_status(self):
-        with self._lock:
-            return {
-                "has_image": self._image is not None,
-                "awaiting_code": not self._event.is_set(),
-                "timestamp": self._created_at,
-            }
+        image, created_at = self._state
+        return {
+            "has_image": image is not None,
+            "awaiting_code": not self._event.is_set(),
+            "timestamp": created_at,
+        }
 
     def get_image(self) -> bytes | None:
-        with self._lock:
-            return self._image
+        return self._state[0]
 
     def create_blueprint(self, prefix: str = "captcha") -> Blueprint:
         bp = Blueprint(prefix, __name__)
@@ -57,10 +55,14 @@ class CaptchaManager:
             return render_template("captcha.html")
 
         def _image_response():
-            img = self.get_image()
+            img, created_at = self._state
             if not img:
                 return Response(status=204)
-            return Response(img, mimetype="image/png")
+            # 以生成时间做 ETag：同一张图重复请求只回 304，不再重发图片字节
+            resp = Response(img, mimetype="image/png")
+            resp.set_etag(repr(created_at))
+            resp.cache_control.no_cache = True
+            return resp.make_conditional(request)
 
         @bp.route("/image")
         def image_route():
@@ -1,23 +1,145 @@
+import asyncio
+import contextlib
 import dataclasses
 import datetime as dt
+import functools
 import json
 import os
 import re
 import sqlite3
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from typing import Any, Callable, Dict, List, Optional, Tuple
+import threading
+from types import MappingProxyType
+from typing import Any, Callable, Dict, Iterator, List, Mapping, Optional, Set, Tuple, Union
 
+import ahocorasick
+import httpx
 import requests
-from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from bs4 import UnicodeDammit
+from lxml import etree
+from lxml import html as lhtml
 from pathlib import Path
 
+from sqlite_pool import apply_pragmas
+
 BASE_DIR = Path(__file__).resolve().parent
 DEFAULT_DB_PATH = str(BASE_DIR / "qn_hydrogen_monitor.db")
+# run() 每处理这么多篇文章提交一次事务，而不是每行各自提交
+CLASSIC_WRITE_BATCH = 50
+# 逐篇处理时的同步兜底抓取（requests）：连接池放大到 app 的 max_workers 上限，保证 keep-alive 连接被复用
+HTTP_POOL_CONNECTIONS = 8
+HTTP_POOL_MAXSIZE = 32
+# 网关类错误短暂重试，其余错误仍直接返回 None
+HTTP_RETRY = Retry(total=2, backoff_factor=0.3, status_forcelist=(502, 503, 504))
+# 正文批量预取走 httpx 异步 + HTTP/2，同一站点的请求复用少量连接多路并发
+FETCH_TIMEOUT = 10.0
+FETCH_CONNECT_RETRIES = 1
+
+# 本进程内已完成建表/补列的数据库文件 (realpath, 设备号, inode)，之后新开的连接跳过 _ensure_schema；
+# 相对路径、绝对路径、软链接解析到同一个文件时共用一条记录；
+# 文件被替换（如损坏后重建）inode 会变，自然重新建表
+_schema_ready_paths: Set[Tuple[str, int, int]] = set()
+_schema_lock = threading.Lock()
 
 
 ClassicProgressCallback = Callable[..., None]
 
 
+@functools.lru_cache(maxsize=4096)
+def _canonical_province(name: str) -> str:
+    for suf in (
+        "特别行政区",
+        "维吾尔自治区",
+        "壮族自治区",
+        "回族自治区",
+        "自治州",
+        "自治区",
+        "省",
+        "市",
+    ):
+        if name.endswith(suf):
+            return name[: -len(suf)]
+    return name
+
+
+def _is_city_like(name: str) -> bool:
+    if not name:
+        return False
+    return name.endswith(("市", "州", "盟", "旗", "县", "区", "镇", "地区"))
+
+
+@functools.lru_cache(maxsize=1)
+def _build_region_index(
+    path: str, mtime_ns: int
+) -> Tuple[Mapping[str, str], Mapping[str, Tuple[str, str]], Optional["ahocorasick.Automaton"]]:
+    """解析行政区划文件，返回只读的 (province_by_token, city_by_token, automaton)；mtime_ns 只用作缓存键。
+
+    automaton 覆盖两张表的全部 token，值为 (token, 省表序号, 市表序号)，不在某表时序号为 -1。
+    """
+    province_by_token: Dict[str, str] = {}
+    city_by_token: Dict[str, Tuple[str, str]] = {}
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except Exception:
+        return MappingProxyType(province_by_token), MappingProxyType(city_by_token), None
+
+    for prov_full, city_dict in data.items():
+        if not isinstance(city_dict, dict):
+            continue
+        prov_canon = _canonical_province(prov_full)
+        prov_tokens = {prov_full, prov_canon}
+        for token in prov_tokens:
+            if token:
+                province_by_token[token] = prov_canon
+
+        # 直辖市等，将省名本身视为“市”
+        city_by_token.setdefault(prov_full, (prov_canon, prov_canon))
+        city_by_token.setdefault(prov_canon, (prov_canon, prov_canon))
+
+        for city_name, districts in city_dict.items():
+            # “市辖区”等虚拟层级不单独作为城市
+            if city_name in {"市辖区", "县"}:
+                continue
+            if _is_city_like(city_name):
+                city_canon = city_name
+                tokens = {city_name}
+                # 兼容“张掖市/张掖”这类写法
+                if len(city_name) > 2:
+                    tokens.add(city_name.rstrip("市州盟旗县区镇地区"))
+                for token in tokens:
+                    if token:
+                        city_by_token.setdefault(token, (prov_canon, city_canon))
+
+            # 下一级（区/旗/县等）
+            if isinstance(districts, dict):
+                dist_iter = districts.keys()
+            else:
+                dist_iter = districts or []
+            for dist_name in dist_iter:
+                if not isinstance(dist_name, str):
+                    continue
+                if not _is_city_like(dist_name):
+                    continue
+                dist_canon = dist_name
+                tokens = {dist_name}
+                if len(dist_name) > 2:
+                    tokens.add(dist_name.rstrip("市州盟旗县区镇地区"))
+                for token in tokens:
+                    if token:
+                        # 例如 达拉特旗 -> (内蒙古, 达拉特旗)
+                        city_by_token.setdefault(token, (prov_canon, dist_canon))
+
+    prov_rank = {token: i for i, token in enumerate(province_by_token)}
+    city_rank = {token: i for i, token in enumerate(city_by_token)}
+    automaton = ahocorasick.Automaton()
+    for token in prov_rank.keys() | city_rank.keys():
+        automaton.add_word(token, (token, prov_rank.get(token, -1), city_rank.get(token, -1)))
+    automaton.make_automaton()
+    return MappingProxyType(province_by_token), MappingProxyType(city_by_token), automaton
+
+
 @dataclasses.dataclass
 class ClassicProject:
     url: str
@@ -112,6 +234,12 @@ class ClassicProjectExtractor:
         "签约": ["签约", "签署协议", "签署合作协议", "合作协议", "签约仪式", "合作签约"],
         "取消": ["取消", "终止", "废标"],
     }
+    # 文章类型判断用的关键词，按优先级排列（项目类复用 PROJECT_WORDS / STAGE_KEYWORDS）
+    ARTICLE_TYPE_KEYWORDS: Dict[str, List[str]] = {
+        "招标": ["招标", "采购", "比选", "中标", "候选人", "询价", "竞谈"],
+        "政策": ["政策", "规划", "通知", "意见", "办法", "标准", "指南", "方案"],
+        "市场": ["报告", "统计", "分析", "预测", "白皮书", "蓝皮书", "行情"],
+    }
     ENERGY_HINTS: Dict[str, List[str]] = {
         "氢能": [
             "氢能",
@@ -189,15 +317,90 @@ class ClassicProjectExtractor:
     LOCATION_CITY_PATTERN = re.compile(
         r"([^\s，。、；:：]{2,12}(?:市|州|盟|旗|县|区|镇))"
     )
+    # 以下正则在每篇文章上都会用到，类加载时编译一次
+    SCORE_CAPACITY_KW_PATTERN = re.compile(r"\d+(\.\d+)?\s*万?\s*千瓦")
+    SCORE_CAPACITY_MW_PATTERN = re.compile(r"\d+(\.\d+)?\s*MW", re.IGNORECASE)
+    SCORE_INVEST_YI_PATTERN = re.compile(r"\d+(\.\d+)?\s*亿元")
+    SCORE_INVEST_WAN_PATTERN = re.compile(r"\d+(\.\d+)?\s*万\s*元")
+    SCORE_LOCATION_PROJECT_PATTERN = re.compile(
+        r"(省|市|自治区|州|盟|旗|县|区).{0,10}(项目|工程|基地|示范|园区)"
+    )
+    SENTENCE_SPLIT_PATTERN = re.compile(r"[。！？\n]+")
+    LIST_MARKER_SPLIT_PATTERN = re.compile(
+        r"(\n\s*(?:\d+[.、]|\(\d+\)|[一二三四五六七八九十]+[、.]))"
+    )
+    LIST_ITEM_NAME_PATTERN = re.compile(r"^([^\s，。；：:！!？?]+(?:项目|工程|基地|示范|园区))")
+    PROJECT_NAME_QUOTE_PATTERN = re.compile(r"《([^》\n]{2,60}项目[^》\n]*)》")
+    PROJECT_NAME_PATTERN = re.compile(r"([^\s，。；：:！!？?]{2,30}?(?:项目|工程|基地|示范|园区))")
+    PROJECT_NAME_PREFIX_PATTERN = re.compile(r"^(关于|拟|一期|二期|三期|首期|全省|全市|我省|我市)")
+    # 容量/投资：一条正则扫一遍全文，按单位查表换算；单位键为去空白、大写后的写法
+    # 值为 (优先级, 乘数, 除数)，优先级小的单位只要出现就优先于文中更靠前的其他单位
+    CAPACITY_PATTERN = re.compile(r"(\d[\d,]*\.?\d*)\s*(万\s*千瓦|(?i:GW|MW)|千瓦|kW|KW|瓦)")
+    CAPACITY_UNITS: Dict[str, Tuple[int, float, float]] = {
+        "万千瓦": (0, 10.0, 1.0),  # 1万千瓦 = 10 MW
+        "GW": (1, 1000.0, 1.0),
+        "MW": (2, 1.0, 1.0),
+        "千瓦": (3, 1.0, 1_000.0),
+        "KW": (3, 1.0, 1_000.0),
+        "瓦": (4, 1.0, 1_000_000.0),
+    }
+    INVEST_PATTERN = re.compile(r"(\d[\d,]*\.?\d*)\s*(亿\s*元?|万\s*元|元)")
+    INVEST_UNITS: Dict[str, Tuple[int, float, float]] = {
+        "亿元": (0, 100_000_000.0, 1.0),
+        "亿": (0, 100_000_000.0, 1.0),
+        "万元": (1, 10_000.0, 1.0),
+        "元": (2, 1.0, 1.0),
+    }
+    OWNER_FIELD_PATTERN = re.compile(
+        r"(建设单位|项目业主|申报单位|业主单位|建设方|牵头单位|投资方|投资主体)[：:]\s*([^\n。；;，,]{2,30})"
+    )
+    OWNER_INVEST_BY_PATTERN = re.compile(r"由([^\s，。；：:！!？?]{2,30}?)投资")
+    OWNER_BUILD_BY_PATTERN = re.compile(r"由([^\s，。；：:！!？?]{2,30}?)建设")
+    OWNER_SOURCE_PATTERN = re.compile(r"来源：([^\s\n]+)")
+    H2_OUTPUT_TPY_PATTERNS = (
+        re.compile(r"(年产|年可生产|年可实现)[^。；\n]{0,8}?(\d+(?:\.\d+)?)(万)?\s*吨[^。；\n]{0,6}?(绿氢|氢气|氢)"),
+        re.compile(r"(绿氢|氢气|氢)[^。；\n]{0,8}?年产[^。；\n]{0,4}?(\d+(?:\.\d+)?)(万)?\s*吨"),
+    )
+    H2_OUTPUT_NM3_PATTERN = re.compile(r"(\d+(?:\.\d+)?)(万)?\s*(标方|Nm³|Nm3)\s*[/每]?\s*(小时|h)")
+    ELECTROLYZER_COUNT_PATTERN = re.compile(r"(\d+)\s*(台|套)\s*电解槽")
+    CO2_REDUCTION_PATTERN = re.compile(
+        r"年减排(?:二氧化碳|CO2)?[^。\n]*?(\d+(?:\.\d+)?)(万)?\s*吨", re.IGNORECASE
+    )
+
+    # 正文容器按优先级依次尝试，等价于 div#content / div.article / div.content / div.main / div.newsText
+    MAIN_TEXT_XPATHS = tuple(
+        etree.XPath(expr)
+        for expr in (
+            "//div[@id='content']",
+            "//div[contains(concat(' ', normalize-space(@class), ' '), ' article ')]",
+            "//div[contains(concat(' ', normalize-space(@class), ' '), ' content ')]",
+            "//div[contains(concat(' ', normalize-space(@class), ' '), ' main ')]",
+            "//div[contains(concat(' ', normalize-space(@class), ' '), ' newsText ')]",
+        )
+    )
+    PARAGRAPH_XPATH = etree.XPath(".//p")
+    # 与 get_text 一致，不取 script/style/template 里的文本
+    TEXT_XPATH = etree.XPath(".//text()[not(parent::script or parent::style or parent::template)]")
 
     def __init__(
         self,
         db_path: str = DEFAULT_DB_PATH,
         session: Optional[requests.Session] = None,
         progress_callback: Optional[ClassicProgressCallback] = None,
+        db_conn: Optional[sqlite3.Connection] = None,
     ) -> None:
         self.db_path = db_path
-        base_session = session or requests.Session()
+        self._shared_conn = db_conn
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(
+                pool_connections=HTTP_POOL_CONNECTIONS,
+                pool_maxsize=HTTP_POOL_MAXSIZE,
+                max_retries=HTTP_RETRY,
+            )
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+        base_session = session
         # 尽量模拟常见浏览器，避免被 news.bjx.com.cn 拒绝（403）
         base_session.headers["User-Agent"] = (
             "Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:132.0) "
@@ -206,30 +409,76 @@ class ClassicProjectExtractor:
         base_session.headers["Accept"] = "text/html,application/xhtml+xml"
         base_session.headers["Accept-Language"] = "zh-CN,zh;q=0.9"
         base_session.headers["Referer"] = "https://www.bjx.com.cn/"
+        base_session.headers["Connection"] = "keep-alive"
         self.session = base_session
         self.progress_callback = progress_callback or (lambda **_: None)
         self._conn: Optional[sqlite3.Connection] = None
         # 行政区划索引（从 cn_regions_raw.json 构建）
-        self._province_by_token: Dict[str, str] = {}
-        self._city_by_token: Dict[str, Tuple[str, str]] = {}
+        self._province_by_token: Mapping[str, str] = {}
+        self._city_by_token: Mapping[str, Tuple[str, str]] = {}
+        self._region_automaton: Optional["ahocorasick.Automaton"] = None
+        self._keyword_automaton = self._build_keyword_automaton()
+        self._in_batch = False
         self._ensure_unique_index()
 
     def _ensure_unique_index(self) -> None:
         """避免 projects_classic 重复 URL。"""
-        with sqlite3.connect(self.db_path) as conn:
-            conn.row_factory = sqlite3.Row
-            self._ensure_schema(conn)
-            conn.execute(
-                "CREATE UNIQUE INDEX IF NOT EXISTS ux_projects_classic_url ON projects_classic(url)"
-            )
+        conn = self._connect()
+        conn.execute(
+            "CREATE UNIQUE INDEX IF NOT EXISTS ux_projects_classic_url ON projects_classic(url)"
+        )
+        conn.commit()
         self._load_region_index()
 
     def _emit(self, **info: Any) -> None:
         self.progress_callback(**info)
 
+    @contextlib.contextmanager
+    def batch_writes(self) -> Iterator[sqlite3.Connection]:
+        """把多篇文章的写入合并进一个 BEGIN IMMEDIATE ... COMMIT 事务，异常时整体回滚。"""
+        conn = self._connect()
+        if self._in_batch:
+            yield conn
+            return
+        if conn.in_transaction:
+            conn.commit()
+        conn.execute("BEGIN IMMEDIATE")
+        self._in_batch = True
+        try:
+            yield conn
+        except BaseException:
+            self._in_batch = False
+            conn.rollback()
+            raise
+        self._in_batch = False
+        conn.commit()
+
+    def _commit(self, conn: sqlite3.Connection) -> None:
+        """批量事务内由 batch_writes 统一提交。"""
+        if not self._in_batch:
+            conn.commit()
+
+    @contextlib.contextmanager
+    def _atomic(self, conn: sqlite3.Connection) -> Iterator[None]:
+        """单篇文章的项目写入要么全成功要么全不写；批量事务内用 SAVEPOINT 实现。"""
+        if not self._in_batch:
+            with conn:
+                yield
+            return
+        conn.execute("SAVEPOINT article")
+        try:
+            yield
+        except BaseException:
+            conn.execute("ROLLBACK TO article")
+            conn.execute("RELEASE article")
+            raise
+        conn.execute("RELEASE article")
+
     def _connect(self) -> sqlite3.Connection:
         def _open() -> sqlite3.Connection:
-            conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            conn = self._shared_conn or apply_pragmas(
+                sqlite3.connect(self.db_path, check_same_thread=False)
+            )
             conn.row_factory = sqlite3.Row
             self._ensure_schema(conn)
             return conn
@@ -250,12 +499,28 @@ class ClassicProjectExtractor:
                     os.replace(self.db_path, backup)
                 except OSError:
                     pass
+                self._shared_conn = None
                 self._conn = _open()
             else:
                 raise
         return self._conn
 
     def _ensure_schema(self, conn: sqlite3.Connection) -> None:
+        try:
+            st = os.stat(self.db_path)
+            key = (os.path.realpath(self.db_path), st.st_dev, st.st_ino)
+        except OSError:
+            key = None
+        if key in _schema_ready_paths:
+            return
+        with _schema_lock:
+            if key in _schema_ready_paths:
+                return
+            self._migrate_schema(conn)
+            if key is not None:
+                _schema_ready_paths.add(key)
+
+    def _migrate_schema(self, conn: sqlite3.Connection) -> None:
         # Ensure articles table exists
         conn.execute(
             """
@@ -392,124 +657,58 @@ class ClassicProjectExtractor:
         conn.commit()
 
     def _load_region_index(self) -> None:
-        """从 cn_regions_raw.json 构建 {token -> (province, city)} 索引."""
+        """从 cn_regions_raw.json 构建 {token -> (province, city)} 索引（进程内按文件 mtime 共享）."""
+        path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cn_regions_raw.json")
         try:
-            base_dir = os.path.dirname(os.path.abspath(__file__))
-            path = os.path.join(base_dir, "cn_regions_raw.json")
-            if not os.path.exists(path):
-                return
-            with open(path, "r", encoding="utf-8") as f:
-                data = json.load(f)
-        except Exception:
+            mtime_ns = os.stat(path).st_mtime_ns
+        except OSError:
             return
+        self._province_by_token, self._city_by_token, self._region_automaton = _build_region_index(
+            path, mtime_ns
+        )
 
-        def canonical_province(name: str) -> str:
-            suffixes = [
-                "特别行政区",
-                "维吾尔自治区",
-                "壮族自治区",
-                "回族自治区",
-                "自治州",
-                "自治区",
-                "省",
-                "市",
-            ]
-            for suf in suffixes:
-                if name.endswith(suf):
-                    return name[: -len(suf)]
-            return name
-
-        def is_city_like(name: str) -> bool:
-            if not name:
-                return False
-            suffixes = ("市", "州", "盟", "旗", "县", "区", "镇", "地区")
-            return name.endswith(suffixes)
-
-        for prov_full, city_dict in data.items():
-            if not isinstance(city_dict, dict):
-                continue
-            prov_canon = canonical_province(prov_full)
-            prov_tokens = {prov_full, prov_canon}
-            for token in prov_tokens:
-                if token:
-                    self._province_by_token[token] = prov_canon
-
-            # 直辖市等，将省名本身视为“市”
-            self._city_by_token.setdefault(prov_full, (prov_canon, prov_canon))
-            self._city_by_token.setdefault(prov_canon, (prov_canon, prov_canon))
-
-            for city_name, districts in city_dict.items():
-                # “市辖区”等虚拟层级不单独作为城市
-                if city_name in {"市辖区", "县"}:
-                    continue
-                if is_city_like(city_name):
-                    city_canon = city_name
-                    tokens = {city_name}
-                    # 兼容“张掖市/张掖”这类写法
-                    if len(city_name) > 2:
-                        tokens.add(city_name.rstrip("市州盟旗县区镇地区"))
-                    for token in tokens:
-                        if token:
-                            self._city_by_token.setdefault(
-                                token, (prov_canon, city_canon)
-                            )
-
-                # 下一级（区/旗/县等）
-                if isinstance(districts, dict):
-                    dist_iter = districts.keys()
-                else:
-                    dist_iter = districts or []
-                for dist_name in dist_iter:
-                    if not isinstance(dist_name, str):
-                        continue
-                    if not is_city_like(dist_name):
-                        continue
-                    dist_canon = dist_name
-                    tokens = {dist_name}
-                    if len(dist_name) > 2:
-                        tokens.add(dist_name.rstrip("市州盟旗县区镇地区"))
-                    for token in tokens:
-                        if token:
-                            # 例如 达拉特旗 -> (内蒙古, 达拉特旗)
-                            self._city_by_token.setdefault(
-                                token, (prov_canon, dist_canon)
-                            )
-
-    def _fetch_article_html(self, url: str) -> Optional[str]:
+    def _fetch_article_html(self, url: str) -> Optional[bytes]:
+        # 直接返回原始字节：由 lxml 按页面 meta charset 解码，省掉 apparent_encoding 对全文的编码探测
         try:
             resp = self.session.get(url, timeout=10)
             resp.raise_for_status()
-            resp.encoding = resp.apparent_encoding or resp.encoding
-            return resp.text
+            return resp.content
         except Exception:
             return None
 
-    def _extract_main_text(self, html: str) -> str:
-        soup = BeautifulSoup(html, "html.parser")
+    def _extract_main_text(self, html: Union[str, bytes]) -> str:
+        # 字节先按 meta charset 解码（与 BeautifulSoup 相同的探测顺序），再交给 lxml 解析
+        try:
+            if isinstance(html, bytes):
+                html = UnicodeDammit(html, is_html=True).unicode_markup or ""
+            try:
+                tree = lhtml.document_fromstring(html)
+            except ValueError:
+                # 带 <?xml encoding=...?> 声明的 str 不能直接解析，转回 UTF-8 字节
+                tree = lhtml.document_fromstring(
+                    html.encode("utf-8"), parser=lhtml.HTMLParser(encoding="utf-8")
+                )
+        except (ValueError, etree.ParserError):
+            return ""
         # Try some common containers used by bjx
-        candidates = []
-        for selector in [
-            "div#content",
-            "div.article",
-            "div.content",
-            "div.main",
-            "div.newsText",
-        ]:
-            node = soup.select_one(selector)
-            if node:
-                candidates.append(node)
-        node = candidates[0] if candidates else soup.body
-        if not node:
+        node = None
+        for xpath in self.MAIN_TEXT_XPATHS:
+            found = xpath(tree)
+            if found:
+                node = found[0]
+                break
+        if node is None:
+            node = tree.find("body")
+        if node is None:
             return ""
         texts: List[str] = []
-        for p in node.find_all("p"):
-            t = p.get_text(" ", strip=True)
+        for p in self.PARAGRAPH_XPATH(node):
+            t = " ".join(s for s in (x.strip() for x in self.TEXT_XPATH(p)) if s)
             if t:
                 texts.append(t)
         # Fallback to all text if paragraphs are empty
         if not texts:
-            t = node.get_text(" ", strip=True)
-            return t
+            return " ".join(s for s in (x.strip() for x in self.TEXT_XPATH(node)) if s)
         return "\n".join(texts)
 
     def _build_text_head(self, title: str, main_text: str, max_chars: int = 600) -> str:
@@ -519,32 +718,50 @@ class ClassicProjectExtractor:
         head += main_text[:max_chars]
         return head
 
-    def _has_any(self, text: str, words: List[str]) -> bool:
-        return any(w in text for w in words)
+    def _build_keyword_automaton(self) -> "ahocorasick.Automaton":
+        """把项目词、阶段词、能源词、文章类型词合进一个 AC 自动机，值为该词所属的 (类别, 名称) 元组。"""
+        buckets: Dict[str, List[Tuple[str, str]]] = {}
+        groups = [("project", {"": self.PROJECT_WORDS}), ("stage", self.STAGE_KEYWORDS),
+                  ("energy", self.ENERGY_HINTS), ("type", self.ARTICLE_TYPE_KEYWORDS)]
+        for kind, mapping in groups:
+            for name, words in mapping.items():
+                for w in words:
+                    buckets.setdefault(w, []).append((kind, name))
+        automaton = ahocorasick.Automaton()
+        for w, tags in buckets.items():
+            automaton.add_word(w, tuple(tags))
+        automaton.make_automaton()
+        return automaton
+
+    def _keyword_hits(self, text: str) -> Set[Tuple[str, str]]:
+        """一次线性扫描，返回 text 命中的全部 (类别, 名称)。"""
+        hits: Set[Tuple[str, str]] = set()
+        for _end, tags in self._keyword_automaton.iter(text):
+            hits.update(tags)
+        return hits
 
     def _compute_classic_score(self, title: str, head: str) -> Tuple[int, Dict[str, bool]]:
         score = 0
         flags: Dict[str, bool] = {}
         combined = f"{title}\n{head}"
+        hits = self._keyword_hits(combined)
 
         # 项目感
-        has_project_word = self._has_any(combined, self.PROJECT_WORDS)
+        has_project_word = ("project", "") in hits
         if has_project_word:
             score += 1
         flags["project_word"] = has_project_word
 
         # 阶段感
-        has_stage = any(
-            self._has_any(combined, kws) for kws in self.STAGE_KEYWORDS.values()
-        )
+        has_stage = any(kind == "stage" for kind, _ in hits)
         if has_stage:
             score += 1
         flags["stage_word"] = has_stage
 
         # 容量感
         has_capacity = bool(
-            re.search(r"\d+(\.\d+)?\s*万?\s*千瓦", combined)
-            or re.search(r"\d+(\.\d+)?\s*MW", combined, re.IGNORECASE)
+            self.SCORE_CAPACITY_KW_PATTERN.search(combined)
+            or self.SCORE_CAPACITY_MW_PATTERN.search(combined)
         )
         if has_capacity:
             score += 1
@@ -552,8 +769,8 @@ class ClassicProjectExtractor:
 
         # 投资感
         has_investment = bool(
-            re.search(r"\d+(\.\d+)?\s*亿元", combined)
-            or re.search(r"\d+(\.\d+)?\s*万\s*元", combined)
+            self.SCORE_INVEST_YI_PATTERN.search(combined)
+            or self.SCORE_INVEST_WAN_PATTERN.search(combined)
         )
         if has_investment:
             score += 1
@@ -561,9 +778,7 @@ class ClassicProjectExtractor:
 
         # 地点 + 项目
         has_location_project = bool(
-            re.search(
-                r"(省|市|自治区|州|盟|旗|县|区).{0,10}(项目|工程|基地|示范|园区)", combined
-            )
+            self.SCORE_LOCATION_PROJECT_PATTERN.search(combined)
         )
         if has_location_project:
             score += 1
@@ -584,7 +799,7 @@ class ClassicProjectExtractor:
 
     def _generate_summary(self, text: str, max_chars: int = 300) -> str:
         # Split into sentences
-        sentences = re.split(r"[。！？\n]+", text)
+        sentences = self.SENTENCE_SPLIT_PATTERN.split(text)
         
         # Keywords to keep
         keywords = [
@@ -626,7 +841,7 @@ class ClassicProjectExtractor:
         # Split text by numbered markers
         # Regex to find "1." or "1、" or "(1)" at start of line
         # We use capturing group to keep the delimiter so we know where it starts
-        parts = re.split(r"(\n\s*(?:\d+[.、]|\(\d+\)|[一二三四五六七八九十]+[、.]))", text)
+        parts = self.LIST_MARKER_SPLIT_PATTERN.split(text)
         
         current_item = {}
         
@@ -642,7 +857,7 @@ class ClassicProjectExtractor:
             first_line = lines[0].strip()
             
             # Clean name (remove punctuation at end)
-            name_match = re.match(r"^([^\s，。；：:！!？?]+(?:项目|工程|基地|示范|园区))", first_line)
+            name_match = self.LIST_ITEM_NAME_PATTERN.match(first_line)
             name = name_match.group(1) if name_match else first_line
             if len(name) > 50: # If too long, it's probably not just a name
                  name = name[:50] + "..."
@@ -656,7 +871,7 @@ class ClassicProjectExtractor:
             for kw in progress_keywords:
                 if kw in overview:
                     # Extract the sentence containing the keyword
-                    sentences = re.split(r"[。！？\n]+", overview)
+                    sentences = self.SENTENCE_SPLIT_PATTERN.split(overview)
                     for s in sentences:
                         if kw in s:
                             progress = s.strip()
@@ -675,13 +890,11 @@ class ClassicProjectExtractor:
     def _extract_project_name(self, title: str, head: str) -> Optional[str]:
         # 1. 优先提取书名号中的内容，通常是项目全称
         # 限制长度，且不允许包含换行符，避免匹配到大段无关文本
-        pattern_quote = r"《([^》\n]{2,60}项目[^》\n]*)》"
-        
-        m_quote = re.search(pattern_quote, title)
+        m_quote = self.PROJECT_NAME_QUOTE_PATTERN.search(title)
         if m_quote:
             return m_quote.group(1)
         
-        m_quote_head = re.search(pattern_quote, head)
+        m_quote_head = self.PROJECT_NAME_QUOTE_PATTERN.search(head)
         if m_quote_head:
             return m_quote_head.group(1)
 
@@ -689,28 +902,27 @@ class ClassicProjectExtractor:
         # 排除 "关于"、"拟" 等前缀
         # 限制长度在 4-30 字之间，避免提取整句话
         # [^\s...] 已经排除换行符，但为了保险，明确长度限制
-        pattern = r"([^\s，。；：:！!？?]{2,30}?(?:项目|工程|基地|示范|园区))"
-        
-        m = re.search(pattern, title)
+        m = self.PROJECT_NAME_PATTERN.search(title)
         if m:
             name = m.group(1)
             # 清理前缀
-            name = re.sub(r"^(关于|拟|一期|二期|三期|首期|全省|全市|我省|我市)", "", name)
+            name = self.PROJECT_NAME_PREFIX_PATTERN.sub("", name)
             if len(name) > 4:
                 return name
 
-        m2 = re.search(pattern, head)
+        m2 = self.PROJECT_NAME_PATTERN.search(head)
         if m2:
             name = m2.group(1)
-            name = re.sub(r"^(关于|拟|一期|二期|三期|首期|全省|全市|我省|我市)", "", name)
+            name = self.PROJECT_NAME_PREFIX_PATTERN.sub("", name)
             if len(name) > 4:
                 return name
                 
         return None
 
     def _extract_stage(self, text: str) -> Optional[str]:
-        for stage, kws in self.STAGE_KEYWORDS.items():
-            if self._has_any(text, kws):
+        hits = self._keyword_hits(text)
+        for stage in self.STAGE_KEYWORDS:
+            if ("stage", stage) in hits:
                 return stage
         return None
 
@@ -721,83 +933,48 @@ class ClassicProjectExtractor:
         except Exception:
             return None
 
-    def _extract_capacity_mw(self, text: str) -> Optional[float]:
-        # 万千瓦 => MW
-        m = re.search(r"(\d[\d,]*\.?\d*)\s*万\s*千瓦", text)
-        if m:
-            v = self._parse_number(m.group(1))
-            if v is not None:
-                return v * 10.0  # 1万千瓦 = 10 MW
-        # GW
-        m = re.search(r"(\d[\d,]*\.?\d*)\s*GW", text, re.IGNORECASE)
-        if m:
-            v = self._parse_number(m.group(1))
-            if v is not None:
-                return v * 1000.0
-        # MW
-        m = re.search(r"(\d[\d,]*\.?\d*)\s*MW", text, re.IGNORECASE)
-        if m:
-            v = self._parse_number(m.group(1))
-            if v is not None:
-                return v
-        # 千瓦/kW
-        m = re.search(r"(\d[\d,]*\.?\d*)\s*(千瓦|kW|KW)", text)
-        if m:
-            v = self._parse_number(m.group(1))
-            if v is not None:
-                return v / 1_000.0
-        # 瓦
-        m = re.search(r"(\d[\d,]*\.?\d*)\s*瓦", text)
-        # MW
-        if m:
+    def _extract_by_unit(
+        self, pattern: "re.Pattern[str]", units: Dict[str, Tuple[int, float, float]], text: str
+    ) -> Optional[float]:
+        """单次 finditer：每种单位取文中第一次出现的数值，返回优先级最高的单位换算结果。"""
+        best: Optional[Tuple[int, float]] = None
+        for m in pattern.finditer(text):
+            rank, mul, div = units["".join(m.group(2).split()).upper()]
+            if best is not None and rank >= best[0]:
+                continue
             v = self._parse_number(m.group(1))
-            if v is not None:
-                return v / 1_000_000.0
-        return None
+            if v is None:
+                continue
+            best = (rank, v * mul / div)
+            if rank == 0:
+                break
+        return best[1] if best else None
+
+    def _extract_capacity_mw(self, text: str) -> Optional[float]:
+        return self._extract_by_unit(self.CAPACITY_PATTERN, self.CAPACITY_UNITS, text)
 
     def _extract_investment_cny(self, text: str) -> Optional[float]:
-        # 亿元
-        m = re.search(r"(\d[\d,]*\.?\d*)\s*亿\s*元?", text)
-        if m:
-            v = self._parse_number(m.group(1))
-            if v is not None:
-                return v * 100_000_000.0
-        # 万元
-        m = re.search(r"(\d[\d,]*\.?\d*)\s*万\s*元", text)
-        if m:
-            v = self._parse_number(m.group(1))
-            if v is not None:
-                return v * 10_000.0
-        # 元
-        m = re.search(r"(\d[\d,]*\.?\d*)\s*元", text)
-        if m:
-            v = self._parse_number(m.group(1))
-            if v is not None:
-                return v
-        return None
+        return self._extract_by_unit(self.INVEST_PATTERN, self.INVEST_UNITS, text)
 
     def _extract_owner(self, text: str) -> Optional[str]:
         # 1. 明确的字段标识
-        m = re.search(
-            r"(建设单位|项目业主|申报单位|业主单位|建设方|牵头单位|投资方|投资主体)[：:]\s*([^\n。；;，,]{2,30})",
-            text,
-        )
+        m = self.OWNER_FIELD_PATTERN.search(text)
         if m:
             return m.group(2).strip()
 
         # 2. "由...投资/建设"
-        m_by = re.search(r"由([^\s，。；：:！!？?]{2,30}?)投资", text)
+        m_by = self.OWNER_INVEST_BY_PATTERN.search(text)
         if m_by:
             return m_by.group(1).strip()
             
-        m_build = re.search(r"由([^\s，。；：:！!？?]{2,30}?)建设", text)
+        m_build = self.OWNER_BUILD_BY_PATTERN.search(text)
         if m_build:
             return m_build.group(1).strip()
 
         # 3. 签约主体 (e.g. "A公司与B政府签约") - 比较难提取单一业主，暂略
 
         # 4. 来源字段 (通常比较准确)
-        m_source = re.search(r"来源：([^\s\n]+)", text)
+        m_source = self.OWNER_SOURCE_PATTERN.search(text)
         if m_source:
             src = m_source.group(1).strip()
             if "网" not in src and "号" not in src and len(src) > 2: # 排除 "xx网", "xx公众号"
@@ -810,12 +987,8 @@ class ClassicProjectExtractor:
 
     def _extract_h2_output_tpy(self, text: str) -> Optional[float]:
         """提取年产氢量（吨/年），优先匹配“年产绿氢/氢气X(万)吨”模式。"""
-        patterns = [
-            r"(年产|年可生产|年可实现)[^。；\n]{0,8}?(\d+(?:\.\d+)?)(万)?\s*吨[^。；\n]{0,6}?(绿氢|氢气|氢)",
-            r"(绿氢|氢气|氢)[^。；\n]{0,8}?年产[^。；\n]{0,4}?(\d+(?:\.\d+)?)(万)?\s*吨",
-        ]
-        for pat in patterns:
-            m = re.search(pat, text)
+        for pat in self.H2_OUTPUT_TPY_PATTERNS:
+            m = pat.search(text)
             if not m:
                 continue
             if len(m.groups()) == 4:
@@ -836,10 +1009,7 @@ class ClassicProjectExtractor:
     def _extract_h2_output_nm3_per_h(self, text: str) -> Optional[float]:
         """提取制氢能力 Nm³/h，例如 30000Nm³/h、1万标方/小时。"""
         # 允许“万”+ 标方/Nm³ + /h /小时
-        m = re.search(
-            r"(\d+(?:\.\d+)?)(万)?\s*(标方|Nm³|Nm3)\s*[/每]?\s*(小时|h)",
-            text,
-        )
+        m = self.H2_OUTPUT_NM3_PATTERN.search(text)
         if not m:
             return None
         try:
@@ -854,7 +1024,7 @@ class ClassicProjectExtractor:
         """提取电解槽台数/套数，例如 46台电解槽、660套电解槽。"""
         if "电解槽" not in text:
             return None
-        m = re.search(r"(\d+)\s*(台|套)\s*电解槽", text)
+        m = self.ELECTROLYZER_COUNT_PATTERN.search(text)
         if not m:
             return None
         try:
@@ -864,11 +1034,7 @@ class ClassicProjectExtractor:
 
     def _extract_co2_reduction_tpy(self, text: str) -> Optional[float]:
         """提取年减排二氧化碳量（吨/年）。"""
-        m = re.search(
-            r"年减排(?:二氧化碳|CO2)?[^。\n]*?(\d+(?:\.\d+)?)(万)?\s*吨",
-            text,
-            flags=re.IGNORECASE,
-        )
+        m = self.CO2_REDUCTION_PATTERN.search(text)
         if not m:
             return None
         try:
@@ -885,24 +1051,25 @@ class ClassicProjectExtractor:
         优先级：招标 > 政策 > 市场 > 项目 > 新闻
         """
         combined = f"{title}\n{text[:500]}" # Check title and beginning of text
+        hits = self._keyword_hits(combined)
         
         # 1. 招标/采购
-        if self._has_any(combined, ["招标", "采购", "比选", "中标", "候选人", "询价", "竞谈"]):
+        if ("type", "招标") in hits:
             return "招标"
             
         # 2. 政策/规划
-        if self._has_any(combined, ["政策", "规划", "通知", "意见", "办法", "标准", "指南", "方案"]):
+        if ("type", "政策") in hits:
             # 排除 "建设方案" 等具体项目方案
             if "印发" in combined or "发布" in combined:
                 return "政策"
                 
         # 3. 市场/分析
-        if self._has_any(combined, ["报告", "统计", "分析", "预测", "白皮书", "蓝皮书", "行情"]):
+        if ("type", "市场") in hits:
             return "市场"
             
         # 4. 项目 (Default for most collector items)
         # If it has project keywords or stage keywords, it's likely a project
-        if self._has_any(combined, self.PROJECT_WORDS) or any(self._has_any(combined, kws) for kws in self.STAGE_KEYWORDS.values()):
+        if any(kind in ("project", "stage") for kind, _ in hits):
             return "项目"
             
         # 5. Default
@@ -916,13 +1083,28 @@ class ClassicProjectExtractor:
         city: Optional[str] = None
         full: Optional[str] = None
 
+        # 一次 AC 扫描拿到每个 token 的首次出现位置；下面按原表顺序只遍历命中的 token
+        first_pos: Dict[str, int] = {}
+        prov_hits: List[Tuple[int, str]] = []
+        city_hits: List[Tuple[int, str]] = []
+        if self._region_automaton is not None:
+            for end, (token, prov_rank, city_rank) in self._region_automaton.iter(text):
+                if token in first_pos:
+                    continue
+                first_pos[token] = end - len(token) + 1
+                if prov_rank >= 0:
+                    prov_hits.append((prov_rank, token))
+                if city_rank >= 0:
+                    city_hits.append((city_rank, token))
+        prov_hits.sort()
+        city_hits.sort()
+
         # 1) 先用行政区划字典匹配省
         best_prov = None
         best_prov_pos = -1
-        for token, prov in self._province_by_token.items():
-            pos = text.find(token)
-            if pos == -1:
-                continue
+        for _, token in prov_hits:
+            prov = self._province_by_token[token]
+            pos = first_pos[token]
             if best_prov is None:
                 best_prov = prov
                 best_prov_pos = pos
@@ -938,10 +1120,9 @@ class ClassicProjectExtractor:
         best_city = None
         best_city_prov = None
         best_city_pos = -1
-        for token, (prov, city_name) in self._city_by_token.items():
-            pos = text.find(token)
-            if pos == -1:
-                continue
+        for _, token in city_hits:
+            prov, city_name = self._city_by_token[token]
+            pos = first_pos[token]
             if province and prov != province:
                 # 已经识别出省时，只接受同省的城市
                 continue
@@ -986,10 +1167,8 @@ class ClassicProjectExtractor:
 
     def _extract_energy_type(self, channel_label: str, text: str) -> Optional[str]:
         text_all = (channel_label or "") + " " + text
-        hits: List[str] = []
-        for etype, kws in self.ENERGY_HINTS.items():
-            if self._has_any(text_all, kws):
-                hits.append(etype)
+        matched = self._keyword_hits(text_all)
+        hits = [etype for etype in self.ENERGY_HINTS if ("energy", etype) in matched]
         if not hits:
             return None
         if len(hits) == 1:
@@ -1009,7 +1188,28 @@ class ClassicProjectExtractor:
             return "B"
         return "C"
 
-    def _process_article_row(self, row: sqlite3.Row, score_threshold: int) -> None:
+    def _fetch_missing_text(self, row: Dict[str, Any]) -> None:
+        """预取没拿到正文的文章逐篇同步兜底抓取，结果回填到 row；须在打开写事务之前调用，避免持锁等网络。"""
+        if row.get("main_text") or row.get("fetch_error"):
+            return
+        html = self._fetch_article_html(row["url"])
+        if not html:
+            # Download failed
+            row["fetch_error"] = "Failed to fetch article HTML (Server Error)"
+            return
+        text = self._extract_main_text(html)
+        if text and text.strip():
+            row["main_text"] = text
+            row["fetched_text"] = True
+        else:
+            # Empty text after extraction
+            row["fetch_error"] = "Empty content after extraction"
+
+    def _process_article_row(self, row: Dict[str, Any], score_threshold: int) -> None:
+        self._fetch_missing_text(row)
+        if row.get("fetch_error"):
+            raise ValueError(row["fetch_error"])
+
         url = row["url"]
         title = row["title"] or ""
         channel_id = row["channel_id"] or ""
@@ -1019,22 +1219,12 @@ class ClassicProjectExtractor:
 
         conn = self._connect()
 
-        if not main_text:
-            html = self._fetch_article_html(url)
-            if html:
-                main_text = self._extract_main_text(html)
-                if main_text and main_text.strip():
-                    conn.execute(
-                        "UPDATE articles SET main_text=?, updated_at=? WHERE url=?",
-                        (main_text, dt.datetime.utcnow().isoformat(), url),
-                    )
-                    conn.commit()
-                else:
-                    # Empty text after extraction
-                    raise ValueError("Empty content after extraction")
-            else:
-                # Download failed
-                raise ValueError("Failed to fetch article HTML (Server Error)")
+        if row.get("fetched_text"):
+            conn.execute(
+                "UPDATE articles SET main_text=?, updated_at=? WHERE url=?",
+                (main_text, dt.datetime.utcnow().isoformat(), url),
+            )
+            self._commit(conn)
 
         if not main_text or not main_text.strip():
              raise ValueError("No content available to process")
@@ -1072,7 +1262,7 @@ class ClassicProjectExtractor:
                 "UPDATE articles SET classic_score=?, worth_classic=?, classic_quality=? WHERE url=?",
                 (score, 0, None, url),
             )
-            conn.commit()
+            self._commit(conn)
             return
 
         text_for_fields = f"{title}\n{main_text[:1200]}"
@@ -1082,7 +1272,7 @@ class ClassicProjectExtractor:
                 "UPDATE articles SET classic_score=?, worth_classic=?, classic_quality=? WHERE url=?",
                 (score, 0, None, url),
             )
-            conn.commit()
+            self._commit(conn)
             return
         stage = self._extract_stage(text_for_fields)
         capacity_mw = self._extract_capacity_mw(text_for_fields)
@@ -1193,7 +1383,7 @@ class ClassicProjectExtractor:
             )
             projects_to_insert.append(p)
 
-        with conn:
+        with self._atomic(conn):
             for project in projects_to_insert:
                 conn.execute(
                     """
@@ -1245,6 +1435,49 @@ class ClassicProjectExtractor:
                 (score, 1, quality, url),
             )
 
+    async def _fetch_article_html_async(self, client: httpx.AsyncClient, url: str) -> Optional[bytes]:
+        try:
+            resp = await client.get(url)
+            resp.raise_for_status()
+            return resp.content
+        except Exception:
+            return None
+
+    async def fetch_many(self, urls: List[str], max_concurrent: int = 10) -> Dict[str, str]:
+        """异步并发抓取并抽取正文，返回 {url: main_text}（失败或空正文的 URL 不在结果里）。"""
+        results: Dict[str, str] = {}
+        if not urls:
+            return results
+        max_concurrent = max(1, int(max_concurrent))
+        sem = asyncio.Semaphore(max_concurrent)
+        transport = httpx.AsyncHTTPTransport(
+            http2=True,
+            retries=FETCH_CONNECT_RETRIES,
+            limits=httpx.Limits(
+                max_connections=max_concurrent,
+                max_keepalive_connections=max_concurrent,
+            ),
+        )
+        # 客户端绑定当前事件循环，每次调用新建；请求头与 Cookie 沿用同步 session
+        async with httpx.AsyncClient(
+            transport=transport,
+            timeout=FETCH_TIMEOUT,
+            headers=dict(self.session.headers),
+            cookies=self.session.cookies,
+            follow_redirects=True,
+        ) as client:
+
+            async def worker(u: str) -> None:
+                async with sem:
+                    html = await self._fetch_article_html_async(client, u)
+                if html:
+                    text = self._extract_main_text(html)
+                    if text:
+                        results[u] = text
+
+            await asyncio.gather(*(worker(u) for u in urls))
+        return results
+
     def _prefetch_main_text(self, rows: List[Dict[str, Any]], max_workers: int = 10) -> None:
         urls_to_fetch = [
             row["url"]
@@ -1254,21 +1487,7 @@ class ClassicProjectExtractor:
         if not urls_to_fetch:
             return
 
-        def worker(u: str) -> Tuple[str, Optional[str]]:
-            html = self._fetch_article_html(u)
-            if not html:
-                return u, None
-            text = self._extract_main_text(html)
-            return u, text or None
-
-        results: Dict[str, str] = {}
-        with ThreadPoolExecutor(max_workers=max_workers) as executor:
-            future_map = {executor.submit(worker, u): u for u in urls_to_fetch}
-            for fut in as_completed(future_map):
-                url, text = fut.result()
-                if text:
-                    results[url] = text
-
+        results = asyncio.run(self.fetch_many(urls_to_fetch, max_concurrent=max_workers))
         if not results:
             return
 
@@ -1315,31 +1534,37 @@ class ClassicProjectExtractor:
         server_errors = 0
         sample_error_url = None
         
-        for idx, row in enumerate(rows, start=1):
-            self._emit(
-                stage="running",
-                message=f"经典规则提取项目中 (北极星内容源错误: {server_errors})",
-                current=idx - 1,
-                total=total,
-                last_error_url=sample_error_url,
-            )
-            try:
-                self._process_article_row(row, score_threshold=score_threshold)
-            except ValueError as e:
-                # This catches "Content too short", "Server Error Content", "Invalid Content"
-                server_errors += 1
-                if not sample_error_url:
-                    sample_error_url = row.get("url")
-                # Optional: Log detailed error for debugging
-                # print(f"Skipping article {row.get('url')}: {e}")
-            except Exception as e:
-                # Catch unexpected errors too
-                server_errors += 1
-                if not sample_error_url:
-                    sample_error_url = row.get("url")
-                import traceback
-                traceback.print_exc()
-                print(f"Error processing article {row.get('url')}: {e}")
+        for start in range(0, total, CLASSIC_WRITE_BATCH):
+            group = rows[start:start + CLASSIC_WRITE_BATCH]
+            # 网络兜底抓取和正文抽取放在事务外，写锁只覆盖本组的 UPDATE/INSERT
+            for row in group:
+                self._fetch_missing_text(row)
+            with self.batch_writes():
+                for idx, row in enumerate(group, start=start + 1):
+                    self._emit(
+                        stage="running",
+                        message=f"经典规则提取项目中 (北极星内容源错误: {server_errors})",
+                        current=idx - 1,
+                        total=total,
+                        last_error_url=sample_error_url,
+                    )
+                    try:
+                        self._process_article_row(row, score_threshold=score_threshold)
+                    except ValueError as e:
+                        # This catches "Content too short", "Server Error Content", "Invalid Content"
+                        server_errors += 1
+                        if not sample_error_url:
+                            sample_error_url = row.get("url")
+                        # Optional: Log detailed error for debugging
+                        # print(f"Skipping article {row.get('url')}: {e}")
+                    except Exception as e:
+                        # Catch unexpected errors too
+                        server_errors += 1
+                        if not sample_error_url:
+                            sample_error_url = row.get("url")
+                        import traceback
+                        traceback.print_exc()
+                        print(f"Error processing article {row.get('url')}: {e}")
         self._emit(
             stage="idle",
             message=f"经典规则提取完成 (北极星内容源错误: {server_errors})",
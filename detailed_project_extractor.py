@@ -201,7 +201,7 @@ class DetailedProjectExtractor:
 
             # 2) If we have not yet submitted a code, try to get one from the web UI (non‑blocking)
             if not submitted_code:
-                captcha_code = self.captcha_manager.wait_for_code(timeout=0.1)
+                captcha_code = self.captcha_manager.wait_for_code(timeout=0)
                 if captcha_code:
                     print(f"Submitting CAPTCHA code from web UI: {captcha_code}")
                     await page.fill("#captcha", captcha_code)
@@ -207,9 +207,11 @@ def fetch_missing_article_texts(
         return
 
     now = dt.datetime.utcnow().isoformat()
-    conn = sqlite3.connect(db_path)
+    # 自动提交模式 + 显式 BEGIN IMMEDIATE：一开始就拿写锁，避免与 Web 端读写碰撞后中途 SQLITE_BUSY
+    conn = sqlite3.connect(db_path, isolation_level=None, timeout=30)
     try:
         cur = conn.cursor()
+        cur.execute("BEGIN IMMEDIATE")
         for url, text in results.items():
             try:
                 cur.execute(
@@ -218,9 +220,10 @@ def fetch_missing_article_texts(
                 )
             except sqlite3.Error:
                 continue
-        conn.commit()
+        cur.execute("COMMIT")
     except sqlite3.Error:
-        conn.rollback()
+        if conn.in_transaction:
+            conn.rollback()
     finally:
         conn.close()
 
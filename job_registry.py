@@ -0,0 +1,63 @@
+import os
+import time
+
+from sqlite_pool import SQLitePool
+
+
+def pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    except OSError:
+        return False
+    return True
+
+
+class JobRegistry:
+    """跨进程的后台任务互斥：在 SQLite 的 app_jobs 表里登记 (任务名, pid)。
+
+    多个 Web 进程共用同一个数据库时，进程内的 is_alive() 只能看到自己的线程；
+    这里用写事务原子地检查并占位，持有者进程已退出的记录视为过期直接接管。
+    """
+
+    def __init__(self, pool: SQLitePool):
+        self.pool = pool
+        self._ready = False
+
+    def _ensure_table(self, cur) -> None:
+        # _ready 由调用方在事务提交后再置位，回滚时建表也会撤销
+        if not self._ready:
+            cur.execute(
+                "CREATE TABLE IF NOT EXISTS app_jobs ("
+                "name TEXT PRIMARY KEY, pid INTEGER NOT NULL, started_at INTEGER NOT NULL)"
+            )
+
+    def acquire(self, name: str) -> bool:
+        """占用任务名；已被其他存活进程占用时返回 False。"""
+        pid = os.getpid()
+        with self.pool.writer() as cur:
+            self._ensure_table(cur)
+            row = cur.execute("SELECT pid FROM app_jobs WHERE name = ?", (name,)).fetchone()
+            # 本进程的旧记录以进程内状态为准（调用方已确认没有在跑）
+            if row and row[0] != pid and pid_alive(row[0]):
+                taken = True
+            else:
+                taken = False
+                cur.execute(
+                    "INSERT OR REPLACE INTO app_jobs (name, pid, started_at) VALUES (?, ?, ?)",
+                    (name, pid, int(time.time())),
+                )
+        self._ready = True
+        return not taken
+
+    def release(self, name: str) -> None:
+        try:
+            with self.pool.writer() as cur:
+                self._ensure_table(cur)
+                cur.execute("DELETE FROM app_jobs WHERE name = ? AND pid = ?", (name, os.getpid()))
+            self._ready = True
+        except Exception:
+            pass
@@ -0,0 +1,115 @@
+import asyncio
+import hashlib
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import orjson
+
+BASE_DIR = Path(__file__).resolve().parent
+DEFAULT_DB_PATH = str(BASE_DIR / "qn_hydrogen_monitor.db")
+# 只缓存低温度（近似确定性）的请求，高温度输出本来就该每次不同
+CACHE_MAX_TEMPERATURE = 0.2
+
+
+class LLMCache:
+    """LLM 响应缓存：按 (model, system, user, temperature) 的 SHA-256 存原始回复。"""
+
+    def __init__(self, db_path: str = DEFAULT_DB_PATH):
+        self.db_path = str(db_path)
+        # aget/aput 跑在 to_thread 的线程池里：每个线程一条私有连接，互不争用同一连接的锁
+        self._tls = threading.local()
+        self._opened: List[sqlite3.Connection] = []
+        self._lock = threading.Lock()
+        self._schema_ready = False
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._tls, "conn", None)
+        if conn is None:
+            # 连接只在创建它的线程里使用；check_same_thread=False 仅为了 close() 能在别的线程统一关闭
+            conn = sqlite3.connect(self.db_path, check_same_thread=False, timeout=30)
+            try:
+                conn.execute("PRAGMA journal_mode=WAL;")
+                conn.execute("PRAGMA synchronous=NORMAL;")
+            except Exception:
+                pass
+            with self._lock:
+                if not self._schema_ready:
+                    conn.execute(
+                        "CREATE TABLE IF NOT EXISTS llm_cache ("
+                        "key TEXT PRIMARY KEY, response BLOB, created_at INT)"
+                    )
+                    conn.commit()
+                    self._schema_ready = True
+                self._opened.append(conn)
+            self._tls.conn = conn
+        return conn
+
+    @staticmethod
+    def make_key(model: str, system: str, user: str, temperature: float) -> str:
+        payload = orjson.dumps({"model": model, "sys": system, "user": user, "temp": temperature})
+        return hashlib.sha256(payload).hexdigest()
+
+    def key_for(self, body: Dict[str, Any]) -> Optional[str]:
+        """从 chat.completions 请求参数算缓存键；温度过高时返回 None（不缓存）。"""
+        temperature = body.get("temperature", 1.0)
+        if temperature is None or temperature > CACHE_MAX_TEMPERATURE:
+            return None
+        system, user = "", ""
+        for msg in body.get("messages") or []:
+            if msg.get("role") == "system":
+                system += msg.get("content") or ""
+            elif msg.get("role") == "user":
+                user += msg.get("content") or ""
+        return self.make_key(body.get("model") or "", system, user, temperature)
+
+    def get(self, key: Optional[str]) -> Optional[str]:
+        if not key:
+            return None
+        try:
+            row = self._connection().execute(
+                "SELECT response FROM llm_cache WHERE key=?", (key,)
+            ).fetchone()
+        except Exception:
+            return None
+        if not row or row[0] is None:
+            return None
+        value = row[0]
+        return value.decode("utf-8") if isinstance(value, (bytes, bytearray)) else str(value)
+
+    def put(self, key: Optional[str], response: str) -> None:
+        if not key or not response:
+            return
+        try:
+            conn = self._connection()
+            conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, response, created_at) VALUES (?, ?, ?)",
+                (key, response.encode("utf-8"), int(time.time())),
+            )
+            conn.commit()
+        except Exception:
+            pass
+
+    async def aget(self, key: Optional[str]) -> Optional[str]:
+        """在线程池里查缓存，sqlite 读写不阻塞事件循环。"""
+        if not key:
+            return None
+        return await asyncio.to_thread(self.get, key)
+
+    async def aput(self, key: Optional[str], response: str) -> None:
+        if not key or not response:
+            return
+        await asyncio.to_thread(self.put, key, response)
+
+    def close(self) -> None:
+        with self._lock:
+            for conn in self._opened:
+                try:
+                    conn.close()
+                except Exception:
+                    pass
+            self._opened.clear()
+            # 换一个新的 threading.local，各线程下次访问时重新建连接
+            self._tls = threading.local()
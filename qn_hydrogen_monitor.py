@@ -11,6 +11,8 @@ from pathlib import Path
 import requests
 from bs4 import BeautifulSoup
 
+from sqlite_pool import apply_pragmas
+
 BASE_DIR = Path(__file__).resolve().parent
 DEFAULT_DB_PATH = str(BASE_DIR / "qn_hydrogen_monitor.db")
 
@@ -93,6 +95,7 @@ class QNHydrogenMonitor:
         db_path: str = DEFAULT_DB_PATH,
         progress_callback: Optional[HydrogenProgressCallback] = None,
         session: Optional[requests.Session] = None,
+        db_conn: Optional[sqlite3.Connection] = None,
     ) -> None:
         self.channels = channels
         self.db_path = db_path
@@ -100,10 +103,13 @@ class QNHydrogenMonitor:
         self.session = session or requests.Session()
         self._lock = threading.Lock()
         self._conn: Optional[sqlite3.Connection] = None
+        self._shared_conn = db_conn
 
     def _connect(self) -> sqlite3.Connection:
         def _open() -> sqlite3.Connection:
-            conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            conn = self._shared_conn or apply_pragmas(
+                sqlite3.connect(self.db_path, check_same_thread=False)
+            )
             conn.execute(
                 """
                 CREATE TABLE IF NOT EXISTS articles (
@@ -159,6 +165,7 @@ class QNHydrogenMonitor:
                     os.replace(self.db_path, backup)
                 except OSError:
                     pass
+                self._shared_conn = None
                 self._conn = _open()
             else:
                 raise
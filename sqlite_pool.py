@@ -0,0 +1,251 @@
+import os
+import queue
+import sqlite3
+import threading
+from contextlib import closing, contextmanager
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+# 每条连接缓存的已编译语句数（默认 128），列表接口的筛选组合较多
+CACHED_STATEMENTS = 256
+# busy_timeout 避免读写碰撞时直接报 SQLITE_BUSY；临时 B 树放内存；20MB 页缓存 + 256MB mmap
+CONNECTION_PRAGMAS = (
+    "PRAGMA journal_mode=WAL;",
+    "PRAGMA synchronous=NORMAL;",
+    "PRAGMA busy_timeout=30000;",
+    "PRAGMA cache_size=-20000;",
+    "PRAGMA temp_store=MEMORY;",
+    "PRAGMA mmap_size=268435456;",
+    "PRAGMA foreign_keys=ON;",
+)
+# 只读连接全部借出时最多等待的秒数，超时报错而不是让请求线程一直挂着
+READER_WAIT_TIMEOUT = 30
+
+
+def apply_pragmas(conn: sqlite3.Connection, read_only: bool = False) -> sqlite3.Connection:
+    """给新连接逐条设置 CONNECTION_PRAGMAS，单条失败不影响其余项。
+
+    连接池之外自己 sqlite3.connect 的地方（如提取器在没借到连接时）也应调用，保持同样的 WAL / 同步级别。
+    """
+    for pragma in CONNECTION_PRAGMAS + (("PRAGMA query_only=1;",) if read_only else ()):
+        try:
+            conn.execute(pragma)
+        except Exception:
+            # 只读连接无法切换 journal_mode，忽略单条失败继续设置其余项
+            pass
+    return conn
+
+
+class SQLitePool:
+    """SQLite 连接池：一条写连接（加锁、BEGIN IMMEDIATE）+ 最多 readers 条只读连接。
+
+    后台任务另用 checkout() 借出整段任务期间独占的读写连接，用完归还复用。
+    新建连接时发现文件不是数据库，会把它改名为 .corrupt，再调用 on_recreate(db_path) 重建空库。
+    借出前核对库文件的 inode，文件被移走重建后，旧连接直接关闭换新的，不再借出。
+    """
+
+    def __init__(
+        self,
+        db_path: str,
+        readers: int = 4,
+        on_recreate: Optional[Callable[[str], None]] = None,
+    ):
+        self.db_path = str(db_path)
+        self.on_recreate = on_recreate
+        self._recover_lock = threading.Lock()
+        self.max_readers = max(1, int(readers))
+        self._writer = None
+        self._writer_lock = threading.Lock()
+        self._readers: "queue.Queue[sqlite3.Connection]" = queue.Queue()
+        self._opened: List[sqlite3.Connection] = []
+        # 连接 -> 打开时库文件的 (st_dev, st_ino)
+        self._file_ids: Dict[sqlite3.Connection, Optional[Tuple[int, int]]] = {}
+        self._opened_lock = threading.Lock()
+        self._reader_count = 0
+        self._task_conns: "queue.Queue[sqlite3.Connection]" = queue.Queue()
+
+    def _open(self, read_only: bool, autocommit: bool) -> sqlite3.Connection:
+        if read_only:
+            conn = sqlite3.connect(
+                Path(self.db_path).resolve().as_uri() + "?mode=ro",
+                uri=True,
+                check_same_thread=False,
+                isolation_level=None,
+                cached_statements=CACHED_STATEMENTS,
+            )
+        else:
+            conn = sqlite3.connect(
+                self.db_path,
+                check_same_thread=False,
+                isolation_level=None if autocommit else "",
+                cached_statements=CACHED_STATEMENTS,
+            )
+        apply_pragmas(conn, read_only)
+        # apply_pragmas 吞掉单条错误，这里读一次文件头确认是数据库
+        try:
+            conn.execute("PRAGMA schema_version").fetchone()
+        except sqlite3.DatabaseError:
+            conn.close()
+            raise
+        return conn
+
+    def _recover(self) -> None:
+        with self._recover_lock:
+            # 其他线程可能已经重建过，先复查一次
+            try:
+                with closing(sqlite3.connect(self.db_path)) as probe:
+                    probe.execute("PRAGMA schema_version").fetchone()
+                return
+            except sqlite3.DatabaseError as exc:
+                if "file is not a database" not in str(exc):
+                    raise
+            try:
+                os.replace(self.db_path, f"{self.db_path}.corrupt")
+            except OSError:
+                pass
+            if self.on_recreate:
+                self.on_recreate(self.db_path)
+
+    def _connect(self, read_only: bool = False, autocommit: bool = True) -> sqlite3.Connection:
+        try:
+            conn = self._open(read_only, autocommit)
+        except sqlite3.DatabaseError as exc:
+            if "file is not a database" not in str(exc):
+                raise
+            self._recover()
+            conn = self._open(read_only, autocommit)
+        conn.row_factory = sqlite3.Row
+        with self._opened_lock:
+            self._opened.append(conn)
+            self._file_ids[conn] = self._file_id()
+        return conn
+
+    def _file_id(self) -> Optional[Tuple[int, int]]:
+        try:
+            st = os.stat(self.db_path)
+        except OSError:
+            return None
+        return st.st_dev, st.st_ino
+
+    def _is_stale(self, conn: sqlite3.Connection) -> bool:
+        """库文件被移走重建（本池 _recover 或提取器/监控器自行处理）后，旧连接仍指向旧文件。"""
+        return self._file_ids.get(conn) != self._file_id()
+
+    def _discard(self, conn: sqlite3.Connection) -> None:
+        with self._opened_lock:
+            self._file_ids.pop(conn, None)
+            try:
+                self._opened.remove(conn)
+            except ValueError:
+                pass
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def _open_reader(self) -> sqlite3.Connection:
+        """在已占好的名额上新建只读连接；没建成就把名额还回去，否则池子会越用越小直至全部阻塞。"""
+        try:
+            return self._connect(read_only=True)
+        except BaseException:
+            with self._opened_lock:
+                self._reader_count -= 1
+            raise
+
+    @contextmanager
+    def writer(self) -> Iterator[sqlite3.Cursor]:
+        """独占写连接：进入时 BEGIN IMMEDIATE，正常退出 COMMIT，异常 ROLLBACK。"""
+        with self._writer_lock:
+            if self._writer is not None and self._is_stale(self._writer):
+                self._discard(self._writer)
+                self._writer = None
+            if self._writer is None:
+                self._writer = self._connect()
+            cur = self._writer.cursor()
+            cur.execute("BEGIN IMMEDIATE")
+            try:
+                yield cur
+            except BaseException:
+                try:
+                    cur.execute("ROLLBACK")
+                except Exception:
+                    pass
+                raise
+            else:
+                cur.execute("COMMIT")
+            finally:
+                cur.close()
+
+    @contextmanager
+    def reader(self) -> Iterator[sqlite3.Connection]:
+        """借出一条只读连接，用完归还；池未满时按需新建，已满时最多等 READER_WAIT_TIMEOUT 秒。"""
+        try:
+            conn = self._readers.get_nowait()
+        except queue.Empty:
+            with self._opened_lock:
+                can_open = self._reader_count < self.max_readers
+                if can_open:
+                    self._reader_count += 1
+            if can_open:
+                conn = self._open_reader()
+            else:
+                try:
+                    conn = self._readers.get(timeout=READER_WAIT_TIMEOUT)
+                except queue.Empty:
+                    raise sqlite3.OperationalError(
+                        f"no reader connection available within {READER_WAIT_TIMEOUT}s"
+                    ) from None
+        if self._is_stale(conn):
+            self._discard(conn)
+            conn = self._open_reader()
+        try:
+            yield conn
+        finally:
+            self._readers.put(conn)
+
+    @contextmanager
+    def checkout(self) -> Iterator[sqlite3.Connection]:
+        """借出一条读写连接给整个后台任务使用（事务由调用方 commit），归还前回滚未提交的事务。
+
+        连接上的 PRAGMA 只在新建时设置一次，任务之间复用，不再每次运行都重新打开。
+        QNHydrogenMonitor / ClassicProjectExtractor 通过 db_conn= 接收这条连接，不传时各自打开；
+        它们发现库文件损坏并移走后会丢掉借来的连接（仍指向旧文件），改用自己新开的连接；
+        这条旧连接归还时按 inode 判定已过期，直接关闭，不会再借给下一个任务。
+        """
+        conn = None
+        try:
+            conn = self._task_conns.get_nowait()
+        except queue.Empty:
+            pass
+        if conn is not None and self._is_stale(conn):
+            self._discard(conn)
+            conn = None
+        if conn is None:
+            conn = self._connect(autocommit=False)
+        conn.row_factory = None
+        try:
+            yield conn
+        finally:
+            try:
+                if conn.in_transaction:
+                    conn.rollback()
+            except sqlite3.Error:
+                pass
+            if self._is_stale(conn):
+                self._discard(conn)
+            else:
+                self._task_conns.put(conn)
+
+    def close(self) -> None:
+        with self._opened_lock:
+            for conn in self._opened:
+                try:
+                    conn.close()
+                except Exception:
+                    pass
+            self._opened.clear()
+            self._file_ids.clear()
+            self._reader_count = 0
+        self._writer = None
+        self._readers = queue.Queue()
+        self._task_conns = queue.Queue()